@@ -1,22 +1,29 @@
 import asyncio
 import discord
-import json
-import operator
 import os
 import re
 import time
-import youtube_dl
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import partial
 
+from cache import CacheInfo
 from const import Strings
-from web_crawler import DataManager, TimeCalculator
+from http_client import HTTPClient
+from keyword_counter import KeywordCounter
+from school_config import SchoolConfig
+from kr_school_meal_parser.menu import Menu
+from peek_notifier import PeekNotifier
+from send_scheduler import SendScheduler
+from subscription import Subscriptions
+from vote_engine import VoteEngine
+from web_crawler import DataManager, TimeCalculator, diff_events, hash_events
+from youtube import YoutubeSearch
 
 
 def public_only(original_func):
     async def wrapper(self, message):
         if isinstance(message.channel, discord.abc.PrivateChannel):
-            await message.channel.send(Strings.PRIVATE_SUPPORT)
+            await self.sender.send(message.channel, Strings.PRIVATE_SUPPORT)
             return
         else:
             return await original_func(self, message)
@@ -27,7 +34,7 @@ def public_only(original_func):
 def admin_only(original_func):
     async def wrapper(self, message):
         if message.author.id not in self.admin:
-            await message.channel.send(Strings.ADMIN_ONLY)
+            await self.sender.send(message.channel, Strings.ADMIN_ONLY)
             return
         else:
             return await original_func(self, message)
@@ -59,7 +66,27 @@ def get_peeklist_to_string(dic):
         string += (str(i) + " ")
     return "%s : %s" % (Strings.PEEK_LIST, string)
 
+def set_cache_footer(em, info):
+    # 캐시된 데이터를 보여줄 때는 언제 받아온 정보인지와 학교 서버의 상태를 표시한다
+    if info is not None:
+        em.set_footer(text=info.describe())
+
+
+def format_meals(meals):
+    # {"breakfast": [...], "lunch": [...], "dinner": [...]}를 식사별로 한 줄씩 보여주는 문자열로 바꾼다
+    lines = []
+    for name, meal in zip(["아침", "점심", "저녁"], ["breakfast", "lunch", "dinner"]):
+        if meals and meals.get(meal):
+            lines.append("**%s** : %s" % (name, ", ".join(meals[meal])))
+    return "\n".join(lines) or "급식 정보가 없습니다."
+
+
+def get_arguments(message):
+    # "gsm history 7d"에서 명령어 뒤에 입력된 ["7d"]만 반환한다
+    return message.content.split()[2:]
+
 weekend_string = Strings.WEEKEND_STRINGS
+VOTE_EMOJIS = (u"\u2B55", u"\u274C")  # 찬성, 반대
 
 
 class Timer:
@@ -76,7 +103,7 @@ class Timer:
 
 
 class GSMBot(discord.Client):
-    def __init__(self, *, admin, debug=False):
+    def __init__(self, *, admin, debug=False, keyword_capacity=None, keyword_total_capacity=10000, peek_window=10):
         self.admin = (admin, )
         self.debug = debug
 
@@ -97,11 +124,33 @@ class GSMBot(discord.Client):
 
         # GSM Bot의 모든 요소를 불러온 후, command_로 시작하는 함수들만 리스트로 만들어서 출력
         # command_x에서 _를 기준으로 맨 뒤, 즉 x만 msg에 추가한다
-        self.commandDocs = "".join(["***%s***\n%s\n" %
-            (i.split("_")[-1], (getattr(self, "command_%s" % i).__doc__).strip()) for i in self.commands])
-
-        self.peekList = {}
-        self.serverCount = {}
+        # Embed의 필드 하나에는 1024자까지만 들어가므로, 명령어 단위로 나눠서 여러 필드에 담는다
+        self.commandDocs = []
+        for i in self.commands:
+            doc = "***%s***\n%s\n" % (i.split("_")[-1], (getattr(self, "command_%s" % i).__doc__).strip())
+            if self.commandDocs and len(self.commandDocs[-1]) + len(doc) <= 1024:
+                self.commandDocs[-1] += doc
+            else:
+                self.commandDocs.append(doc)
+
+        self.keywords = KeywordCounter(os.path.join("..", "keyword"), capacity=keyword_capacity,
+                                       total_capacity=keyword_total_capacity)
+        self.subscriptions = Subscriptions(os.path.join("..", "subscription", "channels.json"))
+        self.schools = SchoolConfig(os.path.join("..", "school", "schools.json"), DataManager.gsm)
+        self.hungry_embeds = {}  # (학교 코드, 날짜, 식사) : (제목, 식단표, CacheInfo, 저장한 시각)
+        self.meal_task = None
+        self.calendar_task = None
+        self.calendar_hashes = {}  # (연도, 월) : (마지막으로 확인한 일정의 해시, 일정 목록)
+        self.youtube = YoutubeSearch()
+        self.youtube_task = None  # 유튜브 추출기를 미리 준비하는 Task
+        self.peekList = {}  # 감시하는 사용자 아이디 : 알림을 보낼 채널의 리스트
+        self.serverCount = {}  # 감시하는 사용자 아이디 : 이번 변경에 대해 받은 이벤트 수
+        self.guildCount = {}  # 감시하는 사용자 아이디 : 봇과 함께 있는 서버 수
+        self.votes = VoteEngine(os.path.join("..", "vote", "journal.jsonl"))
+        self.sender = SendScheduler()  # 디스코드로 보내는 모든 요청은 이 큐를 거친다
+        self.peek_notifier = PeekNotifier(
+            self.render_peek, window=peek_window,
+            send=partial(self.sender.send, priority=SendScheduler.BACKGROUND))
         self.appInfo = None
         self.DESCRIPTION_MESSAGE = "이것은 [GSM](https://www.gsm.hs.kr/)의 학생들을 위해서 만들어진 학교 전용 봇입니다.\n" +\
             "그렇기 때문에 오직 [GSM](https://www.gsm.hs.kr/) 학생들을 위한 편의기능만 제공하고 있습니다.\n"
@@ -112,8 +161,28 @@ class GSMBot(discord.Client):
         activity_name = Strings.DEBUGGING if self.debug else Strings.COMMAND_HELP
         activity = discord.Activity(name=activity_name, type=discord.ActivityType.listening)
         await self.change_presence(activity=activity)
+        self.keywords.start(self.loop)
+        self.votes.start(self.loop, self.send_vote_result)
+        if self.meal_task is None:
+            self.meal_task = self.loop.create_task(self.meal_schedule())
+        if self.calendar_task is None:
+            self.calendar_task = self.loop.create_task(self.calendar_poll())
+        if self.youtube_task is None:
+            self.youtube_task = self.loop.create_task(self.youtube.warm())
         print("GSM Bot 준비 완료!", end="\n\n")
 
+    async def close(self):
+        # 종료되기 전에 메모리에만 있는 키워드를 모두 저장하고, HTTP 세션을 닫는다
+        for task in (self.meal_task, self.calendar_task, self.youtube_task):
+            if task is not None:
+                task.cancel()
+        await self.keywords.close(self.loop)
+        await HTTPClient.close()
+        self.youtube.close()
+        self.votes.stop()
+        self.sender.close()
+        await super().close()
+
     async def on_message(self, message):
         await self.wait_until_ready()
 
@@ -126,11 +195,13 @@ class GSMBot(discord.Client):
                 return
 
             if self.debug and message.author.id not in self.admin:
-                await message.channel.send(Strings.NOW_DEBUGGING)
+                await self.sender.send(message.channel, Strings.NOW_DEBUGGING)
                 return
 
-            # gsm hungry를 입력했다면, 공백을 기준으로 스플릿한 마지막 결과, 즉 hungry가 command 변수에 들어가게 됨
-            command = command.split()[-1]
+            # gsm hungry를 입력했다면, 공백을 기준으로 스플릿한 두 번째 결과, 즉 hungry가 command 변수에 들어가게 됨
+            # 그 뒤에 오는 값들은 get_arguments로 각 명령어에서 따로 읽어온다
+            command = command.split()
+            command = command[1] if len(command) > 1 else command[0]
             func = getattr(self, "command_%s" % command, None)
             # GSMBot 클래스에 해당 명령어가 있으면 func에 함수를 저장함
             # 해당 명령어가 존재하지 않는다면 None을 반환한다.
@@ -152,46 +223,81 @@ class GSMBot(discord.Client):
     async def on_member_update(self, before, after):
         await self.wait_until_ready()
 
-        if before not in self.peekList.keys():  # 감시 리스트에 있지 않으면 바로 리턴
+        if before.id not in self.peekList:  # 감시 리스트에 있지 않으면 바로 리턴
             return
 
         if not before.roles == after.roles:
             return
 
-        msg, em, limit = None, None, 0
+        # 같은 변경이 함께 있는 서버마다 한 번씩 들어오므로, 마지막 이벤트에서만 알림을 보낸다
+        changes, limit = {}, self.guildCount.get(before.id, 1)
 
-        for i in self.guilds:
-            if before in i.members:
-                limit += 1
-
-        self.serverCount[before] += 1
+        self.serverCount[before.id] += 1
 
         if not before.activity == after.activity:
-            msg = "%s님이 %s을 시작하셨습니다." % (
-                before.name, (lambda activity: activity.name if activity else "휴식")(after.activity))
+            get_activity = lambda member: member.activity.name if member.activity else "휴식"
+            changes["activity"] = (get_activity(before), get_activity(after))
 
         if not before.status == after.status:
-            msg = "%s님이 %s에서 %s로 상태를 바꿨습니다." % (
-                before.name, mapping_state_to_message(before.status), mapping_state_to_message(after.status))
+            changes["status"] = (before.status, after.status)
 
         if not before.avatar == after.avatar:
-            em = discord.Embed(title="%s님이 프로필 사진을 바꾸셨습니다" %
-                               before.name, colour=self.color)
-            em.set_image(url=(
-                lambda member: member.avatar_url if member.avatar else member.default_avatar_url)(after))
+            get_avatar = lambda member: (member.avatar, str(member.avatar_url if member.avatar else member.default_avatar_url))
+            changes["avatar"] = (get_avatar(before), get_avatar(after))
 
         if not before.nick == after.nick:
-            msg = "%s님이 %s에서 %s로 닉네임을 변경하셨습니다." % (
-                before, get_nickname(before), get_nickname(after))
+            changes["nick"] = (get_nickname(before), get_nickname(after))
             limit = 1
 
-        if self.serverCount[before] == limit:
-            self.serverCount[before] = 0
-            for i in self.peekList[before]:
-                try:
-                    await i.send(msg, embed=em)
-                except:
-                    print(msg, em)
+        if self.serverCount[before.id] >= limit:
+            self.serverCount[before.id] = 0
+            if not changes:
+                return
+            # 짧은 시간에 여러 번 바뀌더라도 채널마다 한 번에 모아서 보낸다
+            for i in self.peekList[before.id]:
+                self.peek_notifier.add(i, before.id, before.name, changes)
+
+    def render_peek(self, name, changes):
+        # PeekNotifier가 모아둔 변경 사항을 (메시지, Embed)로 만든다
+        lines, em = [], None
+
+        if "activity" in changes:
+            lines.append("%s님이 %s을 시작하셨습니다." % (name, changes["activity"][1]))
+
+        if "status" in changes:
+            before, after = changes["status"]
+            lines.append("%s님이 %s에서 %s로 상태를 바꿨습니다." % (
+                name, mapping_state_to_message(before), mapping_state_to_message(after)))
+
+        if "nick" in changes:
+            lines.append("%s님이 %s에서 %s로 닉네임을 변경하셨습니다." % ((name, ) + changes["nick"]))
+
+        if "avatar" in changes:
+            em = discord.Embed(title="%s님이 프로필 사진을 바꾸셨습니다" % name, colour=self.color)
+            em.set_image(url=changes["avatar"][1][1])
+
+        return "\n".join(lines) or None, em
+
+    def count_guilds(self, user_id):
+        return sum(1 for guild in self.guilds if guild.get_member(user_id) is not None)
+
+    async def on_member_join(self, member):
+        if member.id in self.guildCount:
+            self.guildCount[member.id] += 1
+
+    async def on_member_remove(self, member):
+        if member.id in self.guildCount:
+            self.guildCount[member.id] -= 1
+
+    async def on_guild_join(self, guild):
+        for user_id in self.guildCount:
+            if guild.get_member(user_id) is not None:
+                self.guildCount[user_id] += 1
+
+    async def on_guild_remove(self, guild):
+        for user_id in self.guildCount:
+            if guild.get_member(user_id) is not None:
+                self.guildCount[user_id] -= 1
 
     async def command_gsm(self, message):
         """
@@ -201,37 +307,280 @@ class GSMBot(discord.Client):
 
         em = discord.Embed(title="**GSM Bot**",
                            description=self.DESCRIPTION_MESSAGE, colour=0x7ACDF4)
-        em.add_field(name="**GSM Bot의 명령어**", value=self.commandDocs)
+        for i, docs in enumerate(self.commandDocs):
+            em.add_field(name="**GSM Bot의 명령어**" if i == 0 else "\u200b", value=docs, inline=False)
         em.set_thumbnail(url=Strings.GSM_LOGO)
-        await message.channel.send(embed=em)
+        await self.sender.send(message.channel, embed=em)
 
     @admin_only
     async def command_logout(self, message):
         """
         GSM Bot을 종료시킵니다.
         """
-        await message.channel.send(Strings.GSM_BOT_DIE)
+        await self.sender.send(message.channel, Strings.GSM_BOT_DIE)
         await self.logout()
 
+    @admin_only
+    async def command_metrics(self, message):
+        """
+        대기 중인 메시지 수와 대기 시간을 보여줍니다.
+        """
+        em = discord.Embed(title="메시지 전송 현황", colour=self.color)
+        for name, metrics in self.sender.get_metrics().items():
+            em.add_field(
+                name=name,
+                value="대기 중 : %d개\n보냄 : %d개\n평균 대기 : %.2f초\n최대 대기 : %.2f초" % (
+                    metrics["queued"], metrics["sent"], metrics["avg_wait"], metrics["max_wait"]),
+                inline=True
+            )
+        em.set_footer(text="일괄 삭제로 줄인 요청 : %d개" % self.sender.bulk_deleted)
+        await self.sender.send(message.channel, embed=em)
+
     async def command_hungry(self, message):
         """
         GSM의 다음 식단표를 알려줍니다.
         8:00, 13:30, 19:30을 기준으로 표시하는 식단표가 바뀝니다.
         """
         await message.channel.trigger_typing()
+        school = self.schools.get(message.guild)
+        await self.sender.send(message.channel, embed=await self.get_hungry_embed(datetime.now(), school))
+
+    @public_only
+    async def command_school(self, message):
+        """
+        이 서버의 식단표 학교를 설정합니다.
+        ex) gsm school gwangju high F100000120
+        """
+        arguments = get_arguments(message)
+        if len(arguments) != 3:
+            school = self.schools.get(message.guild)
+            await self.sender.send(message.channel, 
+                "현재 학교 코드는 %s입니다.\n바꾸려면 gsm school 교육청 학교종류 학교코드를 입력해주세요." % school.code)
+            return
+
+        if message.author.id not in self.admin and not message.author.guild_permissions.manage_guild:
+            await self.sender.send(message.channel, "서버 관리 권한이 있는 사용자만 학교를 바꿀 수 있습니다.")
+            return
+
+        try:
+            school = SchoolConfig.parse(*arguments)
+        except ValueError as e:
+            await self.sender.send(message.channel, str(e))
+            return
+
+        self.schools.set(message.guild.id, school)
+        await self.sender.send(message.channel, "이 서버의 학교를 %s로 설정했습니다." % school.code)
+
+    async def command_tomorrow(self, message):
+        """
+        GSM의 내일 하루 식단표를 알려줍니다.
+        """
+        await message.channel.trigger_typing()
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        await self.send_days(message, tomorrow, tomorrow)
+
+    async def command_week(self, message):
+        """
+        GSM의 오늘부터 일주일 동안의 식단표를 알려줍니다.
+        """
+        await message.channel.trigger_typing()
+        today = datetime.now().date()
+        await self.send_days(message, today, today + timedelta(days=6))
+
+    async def command_when(self, message):
+        """
+        해당 음식이 언제 나오는지 알려줍니다.
+        ex) gsm when 떡볶이
+        """
+        query = " ".join(get_arguments(message))
+        if not query:
+            await self.sender.send(message.channel, "찾을 음식 이름을 입력해주세요. ex) gsm when 떡볶이")
+            return
+
+        await message.channel.trigger_typing()
+        found = await DataManager.find_dish(query, self.schools.get(message.guild))
+
+        em = discord.Embed(title="%s이(가) 나오는 날" % query, colour=self.color)
+        if not found:
+            em.description = "이번 달과 다음 달 식단표에서 찾을 수 없습니다."
+        for day, meal, dish in found[:10]:
+            em.add_field(
+                name="%s월 %s일 %s %s" % (day.month, day.day, weekend_string[day.weekday()],
+                                         DataManager.item[Menu.TIMES.index(meal)]),
+                value=dish
+            )
+        await self.sender.send(message.channel, embed=em)
+
+    async def send_days(self, message, start_date, end_date):
+        school = self.schools.get(message.guild)
+        try:
+            days = await DataManager.get_days(start_date, end_date, school)
+        except Exception as e:
+            print("[오류] GSM Bot이 식단표를 받아올 수 없습니다. (%s)" % e)
+            await self.sender.send(message.channel, "식단표를 불러올 수 없습니다.")
+            return
+
+        em = discord.Embed(title="%s월 %s일부터 %s월 %s일까지의 식단표" % (
+            start_date.month, start_date.day, end_date.month, end_date.day), colour=self.color)
+        for day, meals in days:
+            em.add_field(
+                name="%s월 %s일 %s" % (day.month, day.day, weekend_string[day.weekday()]),
+                value=format_meals(meals),
+                inline=False
+            )
+        await self.sender.send(message.channel, embed=em)
+
+    @public_only
+    async def command_subscribe(self, message):
+        """
+        이 채널에 다음 식단표를 자동으로 보내드리며, 다시 입력하면 취소됩니다.
+        ex) gsm subscribe calendar : 학사일정 변경 알림
+        """
+        arguments = get_arguments(message)
+        kind = "calendar" if arguments and arguments[0].lower() == "calendar" else "meal"
+        name = {"meal": "식단표", "calendar": "학사일정 변경"}[kind]
+
+        if self.subscriptions.toggle(kind, message.channel.id):
+            await self.sender.send(message.channel, "이 채널에 %s 알림을 자동으로 보내드립니다!" % name)
+        else:
+            await self.sender.send(message.channel, "%s 자동 알림을 취소했습니다." % name)
+
+    async def get_hungry_embed(self, now, school):
+        # 같은 학교의 같은 날짜, 같은 식사라면 미리 만들어둔 식단표를 사용하고, 꼬리말만 지금 상태로 다시 만든다
+        today = TimeCalculator.get_next_day(now)
+        next_meal = TimeCalculator.get_next_meal_index(today) % 3
+        key = (school.code, today.date(), next_meal)
+
+        if key in self.hungry_embeds:
+            title, description, info, saved_at = self.hungry_embeds[key]
+            age = info.age + time.monotonic() - saved_at
+            # 캐시가 만료될 때가 되면 새로 받아온 식단표가 보이도록 다시 만든다
+            if age <= DataManager.menu_cache.ttl:
+                info = CacheInfo(age, False, DataManager.get_breaker(school.region).state)
+                return self.make_hungry_embed(title, description, info)
 
-        today = TimeCalculator.get_next_day()
         title = "%s년 %s월 %s일 %s의 %s 식단표" % (
             today.year, today.month, today.day,
             weekend_string[int(today.weekday())],
-            ["아침", "점심", "저녁"][TimeCalculator.get_next_meal_index(today) % 3]
+            ["아침", "점심", "저녁"][next_meal]
         )
+        description, info = await DataManager.get_hungry(now, school)
+
+        if info is not None and not info.stale:  # 식단표를 불러오지 못했거나 오래된 정보라면 저장하지 않는다
+            self.hungry_embeds = {k: v for k, v in self.hungry_embeds.items() if k[1] >= key[1]}
+            self.hungry_embeds[key] = (title, description, info, time.monotonic())
+        return self.make_hungry_embed(title, description, info)
+
+    def make_hungry_embed(self, title, description, info):
         em = discord.Embed(
             title=title,
-            description=DataManager.get_command("hungry"),
+            description=description,
             colour=self.color
         )
-        await message.channel.send(embed=em)
+        set_cache_footer(em, info)
+        return em
+
+    async def meal_schedule(self):
+        """
+        식단표가 바뀌기 몇 분 전에 다음 식단표를 미리 만들어두고,
+        바뀌는 시각이 되면 구독한 채널에 한 번에 보낸다.
+        """
+        lead = timedelta(minutes=5)
+
+        while not self.is_closed():
+            boundary = TimeCalculator.get_next_boundary(datetime.now())
+            await asyncio.sleep(max(0, (boundary - lead - datetime.now()).total_seconds()))
+
+            # 구독한 채널들을 학교별로 묶어서, 학교마다 한 번씩만 동시에 식단표를 만든다
+            schools, channels = {}, {}
+            for channel_id in list(self.subscriptions.get("meal")):
+                channel = self.get_channel(channel_id)
+                if channel is not None:
+                    school = self.schools.get(channel.guild)
+                    schools[school.code] = school
+                    channels.setdefault(school.code, []).append(channel)
+
+            schools = list(schools.values())
+            embeds = await asyncio.gather(
+                *[self.get_hungry_embed(boundary, school) for school in schools], return_exceptions=True)
+
+            await asyncio.sleep(max(0, (boundary - datetime.now()).total_seconds()))
+
+            for school, em in zip(schools, embeds):
+                if isinstance(em, Exception):
+                    print("[오류] GSM Bot이 %s의 식단표를 미리 만들 수 없습니다. (%s)" % (school.code, em))
+                    continue
+
+                for channel in channels[school.code]:
+                    try:
+                        await self.sender.send(channel, embed=em, priority=SendScheduler.BACKGROUND)
+                    except discord.errors.HTTPException as e:
+                        print("[오류] %s 채널에 식단표를 보낼 수 없습니다. (%s)" % (channel.id, e))
+
+    async def calendar_poll(self, interval=10 * 60):
+        """
+        interval초마다 이번 달과 다음 달의 학사일정을 새로 받아와서 해시를 비교하고,
+        바뀐 일정이 있을 때만 구독한 채널에 추가, 삭제, 변경된 일정을 보낸다.
+        """
+        while not self.is_closed():
+            today = datetime.now().date().replace(day=1)
+            for month in (today, (today + timedelta(days=32)).replace(day=1)):
+                try:
+                    await self.check_calendar(month.year, month.month, interval)
+                except Exception as e:
+                    print("[오류] GSM Bot이 %s월 학사일정의 변경을 확인할 수 없습니다. (%s)" % (month.month, e))
+
+            await asyncio.sleep(interval)
+
+    async def check_calendar(self, year, month, interval):
+        key = (year, month)
+        if key not in self.calendar_hashes:
+            # 처음 확인하는 달은 캐시나 스냅샷에 있는 일정을 기준으로 삼는다
+            events, info = await DataManager.get_month_events(year, month)
+            self.calendar_hashes[key] = (hash_events(events), events)
+            if info.age < interval:  # 방금 받아온 일정이라면 다시 받아올 필요가 없다
+                return
+
+        events, _ = await DataManager.get_month_events(year, month, refresh=True)
+        digest = hash_events(events)
+        old_digest, old_events = self.calendar_hashes[key]
+        if digest == old_digest:
+            return
+
+        added, removed, changed = diff_events(old_events, events)
+        fields = []
+        for name, days in (("추가", added), ("삭제", removed), ("변경", changed)):
+            for day in sorted(days):
+                fields.append(("[%s] %s월 %s일 %s" % (name, day.month, day.day, weekend_string[day.weekday()]),
+                               "\n".join(days[day])[:1024]))
+
+        # Embed 하나에는 25개의 필드까지만 들어가므로 여러 개로 나눠서 보낸다
+        embeds = []
+        for i in range(0, len(fields), 25):
+            em = discord.Embed(title="%s년 %s월 학사일정이 바뀌었습니다." % (year, month), colour=self.color)
+            for name, value in fields[i:i + 25]:
+                em.add_field(name=name, value=value, inline=False)
+            embeds.append(em)
+        if len(embeds) > 1:
+            for i, em in enumerate(embeds):
+                em.title += " (%s/%s)" % (i + 1, len(embeds))
+
+        sent, failed = 0, 0
+        for channel_id in list(self.subscriptions.get("calendar")):
+            channel = self.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                for em in embeds:
+                    await self.sender.send(channel, embed=em, priority=SendScheduler.BACKGROUND)
+                sent += 1
+            except discord.errors.HTTPException as e:
+                failed += 1
+                print("[오류] %s 채널에 학사일정 변경을 보낼 수 없습니다. (%s)" % (channel_id, e))
+
+        # 한 채널에도 보내지 못했다면 기존 해시를 유지해서 다음 확인 때 다시 보낸다
+        if sent or not failed:
+            self.calendar_hashes[key] = (digest, events)
 
     async def command_calendar(self, message):
         """
@@ -240,12 +589,42 @@ class GSMBot(discord.Client):
         await message.channel.trigger_typing()
         today = datetime.now()
         title = "%s년 %s월의 학사일정" % (today.year, today.month)
+        description, info = await DataManager.get_command("calendar")
         em = discord.Embed(
             title=title,
-            description=DataManager.get_command("calendar"),
+            description=description,
             colour=self.color
         )
-        await message.channel.send(embed=em)
+        set_cache_footer(em, info)
+        await self.sender.send(message.channel, embed=em)
+
+    async def command_next(self, message):
+        """
+        GSM의 다가오는 학사일정을 알려줍니다.
+        ex) gsm next 5
+        """
+        arguments = get_arguments(message)
+        count = int(arguments[0]) if arguments and arguments[0].isdigit() else 5
+        count = max(1, min(count, 20))
+
+        await message.channel.trigger_typing()
+        try:
+            events = await DataManager.get_upcoming_events(count)
+        except Exception as e:
+            print("[오류] GSM Bot이 학사일정을 불러올 수 없습니다. (%s)" % e)
+            await self.sender.send(message.channel, "학사일정을 불러올 수 없습니다.")
+            return
+
+        em = discord.Embed(title="다가오는 학사일정", colour=self.color)
+        if not events:
+            em.description = "다가오는 학사일정이 없습니다."
+        for event in events:
+            em.add_field(
+                name="%s월 %s일 %s" % (event.date.month, event.date.day, weekend_string[event.date.weekday()]),
+                value=event.title,
+                inline=False
+            )
+        await self.sender.send(message.channel, embed=em)
 
     async def command_invite(self, message):
         """
@@ -265,12 +644,12 @@ class GSMBot(discord.Client):
             url=link,
             colour=self.color
         )
-        msg = await message.channel.send(embed=em)
+        msg = await self.sender.send(message.channel, embed=em)
         await asyncio.sleep(15)
 
         try:
-            await msg.delete()
-            await message.channel.send("초대 링크는 자동으로 삭제했습니다.")
+            await self.sender.delete(msg)
+            await self.sender.send(message.channel, "초대 링크는 자동으로 삭제했습니다.")
         except discord.errors.Forbidden:
             pass
 
@@ -278,189 +657,240 @@ class GSMBot(discord.Client):
     async def command_history(self, message):
         """
         해당 서버에서 채팅으로 많이 입력된 키워드들을 보여드립니다.
+        ex) gsm history 7d (today, 7d, 30d)
         """
+        arguments = get_arguments(message)
+        window = arguments[0].lower() if arguments else None
+
+        if window is not None and window not in self.keywords.WINDOWS:
+            await self.sender.send(message.channel, "기간은 %s 중에서 입력해주세요." % ", ".join(self.keywords.WINDOWS))
+            return
+
         await message.channel.trigger_typing()
 
         title = "%s의 입력된 키워드 순위" % message.guild.name
+        if window is not None:
+            title += " (%s)" % window
         em = discord.Embed(title=title, colour=self.color)
 
-        KEYWORD = os.path.join("..", "keyword", "%s.json" % message.guild.id)
-        with open(KEYWORD, "r", encoding="UTF8") as f:
-            read = json.load(f)
-
-        sortedDict = sorted(sorted(read.items(), key=operator.itemgetter(
-            0)), key=operator.itemgetter(1), reverse=True)
-        # 딕셔너리를 정렬한다. 기준은 value값(입력된 횟수)의 내림차순
-
-        for i in range(10 if len(sortedDict) > 10 else len(sortedDict)):
+        # 전체 순위는 메시지가 들어올 때마다 갱신해둔 상위 10개의 키워드만 가져오고,
+        # 기간별 순위는 미리 합쳐둔 시간/일 단위 버킷만 합쳐서 계산한다
+        for i, (keyword, count, error) in enumerate(self.keywords.get_top(message.guild.id, window)):
+            # 근사 모드에서는 실제 횟수가 (횟수 - 오차) ~ 횟수 사이에 있다
             em.add_field(
                 name="%d위" % (i + 1),
-                value="%s : %d회\n" % (sortedDict[i][0], sortedDict[i][1])
+                value="%s : %d회\n" % (keyword, count) if not error else
+                      "%s : %d~%d회\n" % (keyword, count - error, count)
             )
 
-        await message.channel.send(embed=em)
+        if self.keywords.is_approximate(message.guild.id, window):
+            em.set_footer(text="이 서버는 상위 %d개의 키워드만 보관하는 근사 집계를 사용합니다."
+                               % self.keywords.get_capacity(message.guild.id))
+
+        await self.sender.send(message.channel, embed=em)
 
     @public_only
     async def command_vote(self, message):
         """
-        주제를 정하고 OX 찬반 투표를 생성합니다.
+        진행 중인 투표를 보여주고, gsm vote new로 OX 찬반 투표를 만듭니다.
+        ⭕ 또는 ❌ 반응으로 투표하며, 둘 다 누르면 무효입니다.
         """
         if not message.channel.permissions_for(message.guild.get_member(self.user.id)).manage_messages:
-            await message.channel.send(Strings.DONT_HAVE_PERMISSION)
+            await self.sender.send(message.channel, Strings.DONT_HAVE_PERMISSION)
             return
 
-        channel_id = message.guild.id
-        directory = os.path.join("..", "vote", "%s.json" % channel_id)
+        arguments = get_arguments(message)
+        polls = self.votes.get_polls(message.guild.id)
 
-        if os.path.exists(directory):  # 파일이 있다면 이미 투표가 진행되고 있다는 의미
-            try:
-                with open(directory, "r", encoding="UTF8") as f:
-                    data = json.load(f)
-            except FileNotFoundError:
-                await message.channel.send("%s 투표가 종료돼서 제대로 반영이 되지 않았습니다." % message.author.mention)
+        if arguments and arguments[0].isdigit():  # gsm vote 번호
+            poll = self.votes.get(int(arguments[0]))
+            if poll is None or poll.guild_id != message.guild.id:
+                await self.sender.send(message.channel, "%s번 투표는 진행 중이 아닙니다." % arguments[0])
                 return
-
-            title = "현재 %s에 대한 투표가 진행중입니다." % data["subject"]
-            desc = "%s, 1:1 채팅을 보냈습니다. 투표는 1:1 채팅에서 진행해주세요." % message.author.mention
+            if poll.message_id is not None:  # 반응으로 투표하는 투표라면 투표 메시지를 알려준다
+                await self.sender.send(message.channel, "%s번 투표는 투표 메시지에 반응을 눌러서 참가해주세요.\nhttps://discord.com/channels/%s/%s/%s" % (
+                    poll.id, poll.guild_id, poll.channel_id, poll.message_id))
+                return
+            await self.send_ballot(message, poll)
+        elif polls and not (arguments and arguments[0].lower() == "new"):
             em = discord.Embed(
-                title=title,
-                description=desc,
+                title="현재 진행 중인 투표입니다.",
+                description="투표 메시지에 반응을 눌러서 투표에 참가해주세요!\n새로운 투표는 gsm vote new로 만들 수 있습니다.",
                 colour=self.color
             )
-            em.add_field(
-                name="투표 종료까지",
-                value="%s분 남았습니다." % int((data["start"] + data["time"] - time.time()) / 60)
-            )
-            await message.channel.send(embed=em)
+            for poll in polls:
+                em.add_field(
+                    name="%s번 : %s" % (poll.id, poll.subject),
+                    value="%s분 남았습니다." % int(poll.remaining / 60),
+                    inline=False
+                )
+            await self.sender.send(message.channel, embed=em)
+        else:
+            await self.create_vote(message)
 
-            em = discord.Embed(
-                title="%s의 투표를 진행해주세요." % data["subject"], description="앞에 GSM은 붙이지 않습니다.",
-                colour=self.color
-            )
-            em.add_field(name="찬성 투표", value="O 입력")
-            em.add_field(name="반대 투표", value="X 입력")
-            quest = await message.author.send(embed=em)
+    async def send_ballot(self, message, poll):
+        # 반응으로 투표를 받기 전에 만들어진 투표는 1:1 채팅으로 O, X를 입력받아서 반영한다
+        title = "현재 %s에 대한 투표가 진행중입니다." % poll.subject
+        desc = "%s, 1:1 채팅을 보냈습니다. 투표는 1:1 채팅에서 진행해주세요." % message.author.mention
+        em = discord.Embed(
+            title=title,
+            description=desc,
+            colour=self.color
+        )
+        em.add_field(
+            name="투표 종료까지",
+            value="%s분 남았습니다." % int(poll.remaining / 60)
+        )
+        await self.sender.send(message.channel, embed=em)
 
-            response = await self.wait_for("message", check=lambda m: message.author == m.author and message.author.dm_channel == m.channel, timeout=float(30))
-            # 명령어를 입력한 사용자로부터 답변을 기다린 후, response에 저장해둠
+        em = discord.Embed(
+            title="%s의 투표를 진행해주세요." % poll.subject, description="앞에 GSM은 붙이지 않습니다.",
+            colour=self.color
+        )
+        em.add_field(name="찬성 투표", value="O 입력")
+        em.add_field(name="반대 투표", value="X 입력")
+        quest = await self.sender.send(message.author, embed=em)
 
-            if response is None:  # 질문에 대해 시간 초과가 일어나면 None이 리턴된다
-                await quest.channel.send("%s 투표가 제대로 되지 않았습니다. 다시 시도해주세요." % message.author.mention)
-                return
+        try:
+            response = await self.wait_for("message", check=lambda m: message.author == m.author and message.author.dm_channel == m.channel, timeout=float(30))
+        except asyncio.TimeoutError:
+            response = None
+        # 명령어를 입력한 사용자로부터 답변을 기다린 후, response에 저장해둠
 
-            content = response.content
+        if response is None:  # 질문에 대해 시간 초과가 일어나면 None이 리턴된다
+            await self.sender.send(quest.channel, "%s 투표가 제대로 되지 않았습니다. 다시 시도해주세요." % message.author.mention)
+            return
 
-            if content.upper() == "O" or content.upper() == "X":  # O나 X로 들어온 답변만 json파일에 입력함
-                # 파일을 읽고 받아온 딕셔너리를 업데이트한다
-                data[response.author.id] = content.upper()
+        content = response.content.upper()
 
-                if os.path.exists(directory):  # 투표를 하려고 명령어를 친 후에 투표가 끝나는 경우를 위해서 파일 재검사
-                    with open(directory, "w", encoding="UTF8") as f:
-                        json.dump(data, f, ensure_ascii=False, indent=4)
-                else:  # 파일이 없다면 투표가 끝났다는 의미이므로 함수 종료
-                    await quest.channel.send("%s 투표가 종료돼서 제대로 반영이 되지 않았습니다." % message.author.mention)
-                    return
+        if content == "O" or content == "X":  # O나 X로 들어온 답변만 반영함
+            # 투표를 하려고 명령어를 친 후에 투표가 끝나는 경우에는 반영되지 않는다
+            if not self.votes.vote(poll.id, response.author.id, content):
+                await self.sender.send(quest.channel, "%s 투표가 종료돼서 제대로 반영이 되지 않았습니다." % message.author.mention)
+                return
 
-                await quest.channel.send("%s의 투표가 잘 처리되었습니다." % response.author.name)
-            else:
-                await quest.channel.send("%s 투표가 제대로 처리되지 않았습니다." % response.author.mention)
+            await self.sender.send(quest.channel, "%s의 투표가 잘 처리되었습니다." % response.author.name)
+        else:
+            await self.sender.send(quest.channel, "%s 투표가 제대로 처리되지 않았습니다." % response.author.mention)
 
-        else:  # 투표가 진행되고 있지 않을 때
-            msg = '투표 주제와 투표 시간을 입력해주세요.\n"10분동안 설문" 이라는 제목으로 10분동안 투표하려면\nex) "10분동안 설문 10" 라고 입력해주세요. 앞에 GSM 은 붙이지 않습니다.'
-            quest = await message.channel.send(msg)
+    async def create_vote(self, message):
+        msg = '투표 주제와 투표 시간을 입력해주세요.\n"10분동안 설문" 이라는 제목으로 10분동안 투표하려면\nex) "10분동안 설문 10" 라고 입력해주세요. 앞에 GSM 은 붙이지 않습니다.'
+        quest = await self.sender.send(message.channel, msg)
 
+        try:
             response = await self.wait_for("message", check=lambda m: message.author == m.author and message.channel == m.channel, timeout=float(30))
-            await quest.delete()
+        except asyncio.TimeoutError:
+            response = None
+        await self.sender.delete(quest)
 
-            if response is None:
-                await message.channel.send("%s 투표가 제대로 시작되지 않았습니다." % message.author.mention)
-                return
+        if response is None:
+            await self.sender.send(message.channel, "%s 투표가 제대로 시작되지 않았습니다." % message.author.mention)
+            return
 
-            content = response.content
-            await response.delete()
+        content = response.content
+        await self.sender.delete(response)
 
-            # Cancel을 입력했다면 함수를 종료하며 투표 생성 취소
-            if content.split()[0].lower() == "cancel":
-                await message.channel.send("투표가 취소되었습니다.")
+        # Cancel을 입력했다면 함수를 종료하며 투표 생성 취소
+        if content.split()[0].lower() == "cancel":
+            await self.sender.send(message.channel, "투표가 취소되었습니다.")
+            return
 
-            try:
-                # 몇 분동안 투표를 진행할건지 파악하기 위해서 스플릿 마지막 결과 저장
-                _time = float(content.split()[-1])
-            except ValueError:  # 문자열을 숫자로 바꾸려고 하면 ValueError 발생
-                await message.channel.send("투표 시간이 제대로 입력되지 않았습니다.")
-                return
+        try:
+            # 몇 분동안 투표를 진행할건지 파악하기 위해서 스플릿 마지막 결과 저장
+            _time = float(content.split()[-1])
+        except ValueError:  # 문자열을 숫자로 바꾸려고 하면 ValueError 발생
+            await self.sender.send(message.channel, "투표 시간이 제대로 입력되지 않았습니다.")
+            return
 
-            # 스플릿 마지막 결과(시간)을 제외한 나머지를 content에 저장
-            content = content.split()[0:-1]
-            subject = "".join([(i + " ") for i in content]
-                              )  # 입력받았을 때 처럼 띄어쓰기를 넣기 위함
+        # 스플릿 마지막 결과(시간)을 제외한 나머지를 subject에 저장
+        subject = " ".join(content.split()[0:-1])
 
-            # 딕셔너리에 subject와 시작 시간, 투표 기간을 저장함
-            temp = {"subject": subject, "start": time.time(),
-                    "time": _time * 60}
-            with open(directory, "w", encoding="UTF8") as f:
-                # temp 딕셔너리를 넣은 json파일 생성
-                json.dump(temp, f, ensure_ascii=False, indent=4)
+        # time을 분 단위로 받았지만 마감 시각은 초 단위로 계산하므로 60을 곱해줌
+        poll = self.votes.open(message.guild.id, message.channel.id, subject, _time * 60)
 
-            em = discord.Embed(title="☆★%s의 투표★☆" %
-                               message.guild.name, colour=self.color)
-            em.add_field(name="%s" %
-                         subject, value="gsm vote를 입력하시고 투표에 참가해주세요!")
+        em = discord.Embed(title="☆★%s의 투표★☆" %
+                           message.guild.name, colour=self.color)
+        em.add_field(name="%s번 : %s" % (poll.id, subject),
+                     value="찬성은 %s, 반대는 %s을 눌러서 투표에 참가해주세요!\n둘 다 누르면 무효가 됩니다." % VOTE_EMOJIS)
 
-            await message.channel.send(embed=em)
-            # time을 분 단위로 받았지만 asyncio.sleep은 초 단위로 작동하므로 60을 곱해줌
-            await asyncio.sleep(_time * 60)
+        quest = await self.sender.send(message.channel, embed=em)
+        # 표는 마감할 때 반응을 한 번에 세므로, 투표하는 동안에는 따로 처리하지 않는다
+        self.votes.attach(poll.id, quest.id)
+        for emoji in VOTE_EMOJIS:
+            await self.sender.add_reaction(quest, emoji)
 
-            with open(directory, "r", encoding="UTF8") as f:
-                # asyncio.sleep을 통해 대기하는 동안 추가된 데이터를 다시 읽어들임
-                data = json.load(f)
+    async def send_vote_result(self, poll):
+        # VoteEngine이 마감 시각이 된 투표를 닫을 때 실행된다
+        channel = self.get_channel(poll.channel_id)
+        if channel is None:
+            return
 
-            del(data["subject"], data["start"],
-                data["time"])  # 투표 주제와 시간 정보를 제외한
-            result = {"O": 0, "X": 0}  # 나머지 키:값쌍의 value값(O, X)을 저장함
-            for i in data:
-                result[data[i]] += 1  # result 딕셔너리에 저장함
+        if poll.message_id is not None:
+            try:
+                ballots = await self.count_reactions(channel, poll.message_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 표를 세지 못했다면 0:0 결과를 보내지 않고, VoteEngine이 다시 시도하도록 예외를 넘긴다
+                if poll.attempts < self.votes.MAX_ATTEMPTS:
+                    raise
+                print("[오류] %s번 투표의 표를 셀 수 없습니다. (%s)" % (poll.id, e))
+                await self.sender.send(channel, "%s의 투표결과를 집계하지 못했습니다." % poll.subject,
+                                       priority=SendScheduler.BACKGROUND)
+                return
+            poll.ballots.update(ballots)
 
-            em = discord.Embed(title="☆★%s의 투표결과★☆" %
-                               subject, colour=self.color)
-            em.add_field(name="찬성", value=result["O"])
-            em.add_field(name="반대", value=result["X"])
+        result = poll.tally()
+        em = discord.Embed(title="☆★%s의 투표결과★☆" %
+                           poll.subject, colour=self.color)
+        em.add_field(name="찬성", value=result["O"])
+        em.add_field(name="반대", value=result["X"])
 
-            await message.channel.send(embed=em)
+        await self.sender.send(channel, embed=em, priority=SendScheduler.BACKGROUND)
 
-            try:
-                os.remove(directory)  # 투표가 끝났으므로 파일 삭제
-            except PermissionError:  # 파일을 프로그램이 점유하고 있을 때 PermissionError 발생
-                for i in range(10):  # 대략 10초동안 1초마다 삭제를 시도
-                    await asyncio.sleep(1)
-                    os.remove(directory)
+    async def count_reactions(self, channel, message_id):
+        """
+        투표 메시지의 반응을 한 번에 세서 {사용자 아이디 : "O" 또는 "X"}로 반환한다.
+        찬성과 반대를 모두 누른 사용자의 표는 세지 않는다.
+        메시지나 반응을 불러오지 못하면 예외가 그대로 발생한다.
+        """
+        quest = await self.sender.call(channel, channel.fetch_message, message_id, priority=SendScheduler.BACKGROUND)
+
+        voters = {choice: set() for choice in "OX"}
+        for reaction in quest.reactions:
+            if reaction.emoji in VOTE_EMOJIS:
+                choice = "O" if reaction.emoji == VOTE_EMOJIS[0] else "X"
+                voters[choice] = {user.id for user in await reaction.users().flatten() if not user.bot}
+
+        both = voters["O"] & voters["X"]
+        return {user: choice for choice, users in voters.items() for user in users - both}
 
     async def command_image(self, message):
         """
         구글에서 해당 키워드를 검색한 후, 결과를 사진으로 보내줍니다.
         """
-        quest = await message.channel.send("검색어를 입력해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
+        quest = await self.sender.send(message.channel, "검색어를 입력해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
         response = await self.wait_for("message", check=lambda m: message.author == m.author and message.channel == m.channel, timeout=float(30))
 
         try:
-            await quest.delete()
+            await self.sender.delete(quest)
         except discord.errors.Forbidden:
             pass
 
         if response is None or response.content.lower() == "cancel":
-            await message.channel.send("이미지 검색이 취소되었습니다.")
+            await self.sender.send(message.channel, "이미지 검색이 취소되었습니다.")
             return
 
         await message.channel.trigger_typing()
 
         keyword = response.content
         try:
-            await response.delete()
+            await self.sender.delete(response)
         except discord.errors.Forbidden:
             pass
 
         print("%s : image %s" % (message.author, keyword))
-        image = DataManager.get_command("image", keyword)
+        image = await DataManager.get_command("image", keyword)
 
         if image is None:
             em = discord.Embed(title="%s의 이미지 검색 결과" % keyword,
@@ -476,7 +906,7 @@ class GSMBot(discord.Client):
             text="%s님이 요청하신 검색 결과" % message.author.name,
             icon_url=avatar
         )
-        await message.channel.send(embed=em)
+        await self.sender.send(message.channel, embed=em)
 
     @public_only
     async def command_peek(self, message):
@@ -484,16 +914,16 @@ class GSMBot(discord.Client):
         GSM Bot의 종료 전까지 선택한 사용자의 상태를 계속해서 감시합니다!
         같은 사용자를 다시 입력할 시엔 감시가 해제됩니다.
         """
-        quest = await message.channel.send("감시할 사용자를 언급해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
+        quest = await self.sender.send(message.channel, "감시할 사용자를 언급해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
         response = await self.wait_for("message", check=lambda m: message.author == m.author and message.channel == m.channel, timeout=float(15))
 
         try:
-            await quest.delete()
+            await self.sender.delete(quest)
         except discord.errors.Forbidden:
             pass
 
         if response is None or response.content.lower() == "cancel":
-            await message.channel.send("감시가 취소되었습니다.")
+            await self.sender.send(message.channel, "감시가 취소되었습니다.")
             return
 
         user = response.content
@@ -504,30 +934,36 @@ class GSMBot(discord.Client):
             # value로 이름붙인 그룹을 가져와서 discord.Member 객체를 얻음
             user = message.guild.get_member(int(result.group("value")))
         else:
-            await message.channel.send("올바르지 않은 ID 값이 들어왔습니다.")
+            user = None
+
+        if user is None:  # 올바른 언급이 아니거나 서버에 없는 사용자라면
+            await self.sender.send(message.channel, "올바르지 않은 ID 값이 들어왔습니다.")
             return
 
-        self.serverCount[user] = 0
+        self.serverCount[user.id] = 0
 
-        if not user in self.peekList.keys():  # 감시 리스트에 user가 없다면
-            self.peekList[user] = [message.channel]  # 새로 추가
-            await message.channel.send("%s의 감시를 시작합니다!" % user.name)
+        if not user.id in self.peekList:  # 감시 리스트에 user가 없다면
+            self.peekList[user.id] = [message.channel]  # 새로 추가
+            # 함께 있는 서버 수는 감시를 시작할 때 한 번만 세고, 이후로는 입장/퇴장 이벤트로 갱신한다
+            self.guildCount[user.id] = self.count_guilds(user.id)
+            await self.sender.send(message.channel, "%s의 감시를 시작합니다!" % user.name)
             print(get_peeklist_to_string(self.peekList))
             return
         else:  # 감시 리스트에 user가 있다면
-            for i in self.peekList[user]:  # self.peekList[user]은 user의 채널의 리스트
+            for i in self.peekList[user.id]:  # self.peekList[user.id]은 user의 채널의 리스트
                 if i.guild == message.guild:  # 감시하고 있는 서버에서 다시 한번 입력됐을 때
-                    if len(self.peekList[user]) == 1:
-                        del self.peekList[user]
+                    if len(self.peekList[user.id]) == 1:
+                        del self.peekList[user.id]
+                        del self.guildCount[user.id]
                     else:
-                        self.peekList[user].remove(message.channel)
-                    await message.channel.send("%s의 감시를 취소합니다." % user.name)
+                        self.peekList[user.id].remove(i)
+                    await self.sender.send(message.channel, "%s의 감시를 취소합니다." % user.name)
                     print(get_peeklist_to_string(self.peekList))
                     return
 
             # 이미 user가 있지만 새로운 서버에서 peek을 실행했을 때
-            self.peekList[user].append(message.channel)
-            await message.channel.send("%s의 감시를 시작합니다!" % user.name)
+            self.peekList[user.id].append(message.channel)
+            await self.sender.send(message.channel, "%s의 감시를 시작합니다!" % user.name)
             print(get_peeklist_to_string(self.peekList))
             return
 
@@ -538,57 +974,45 @@ class GSMBot(discord.Client):
         최근의 20개의 메시지에서 GSM Bot의 메시지를 검색하여 삭제합니다.
         """
         if not message.channel.permissions_for(message.guild.get_member(self.user.id)).read_message_history:
-            await message.channel.send("Bot에게 메시지 기록 보기 권한이 없습니다.")
+            await self.sender.send(message.channel, "Bot에게 메시지 기록 보기 권한이 없습니다.")
             return
 
         num = len(await message.channel.purge(limit=20, check=lambda message: message.author == self.user))
-        await message.channel.send("GSM Bot의 메시지를 %d개 삭제했습니다." % num)
+        await self.sender.send(message.channel, "GSM Bot의 메시지를 %d개 삭제했습니다." % num)
 
     async def command_youtube(self, message):
         """
         유튜브에서 해당 키워드를 검색한 후, 원하는 결과를 URL로 보내드립니다.
         """
-        options = {
-            "format": "bestaudio/best",
-            "extractaudio": True,
-            "audioformat": "mp3",
-            "outtmpl": "%(title)s.%(ext)s",
-            "noplaylist": True,
-            "nocheckcertificate": True,
-            "ignoreerrors": True,
-            "logtostderr": False,
-            "quiet": True,
-            "no_warnings": True
-        }
-
         try:
-            quest = await message.channel.send("유튜브 검색을 원하는 키워드를 입력해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
+            quest = await self.sender.send(message.channel, "유튜브 검색을 원하는 키워드를 입력해주세요. 앞에 GSM은 붙이지 않습니다.\n취소하시려면 Cancel을 입력해주세요.")
             response = await self.wait_for("message", check=lambda m: m.author == message.author and m.channel == message.channel, timeout=float(20))
-            await quest.delete()
+            await self.sender.delete(quest)
         except discord.errors.Forbidden:
             pass
 
         if response is None or response.content.lower() == "cancel":
-            await message.channel.send("검색이 취소되었습니다.")
+            await self.sender.send(message.channel, "검색이 취소되었습니다.")
             return
 
-        search_query = "ytsearch5:%s" % response.content
-
-        status = await message.channel.send("현재 겁나 열심히 검색중입니다! (•⌄•๑)و")
+        status = await self.sender.send(message.channel, "현재 겁나 열심히 검색중입니다! (•⌄•๑)و")
         await message.channel.trigger_typing()
 
-        with youtube_dl.YoutubeDL(options) as yt:
-            info = await self.loop.run_in_executor(None, partial(yt.extract_info, search_query, download=False))
+        # 검색 결과는 하나씩 받아오므로, 첫 번째 결과를 받는 대로 보낸다
+        count = 5
+        index = 0
+        async for e in self.youtube.search(response.content, count):
+            if status is not None:
+                await self.sender.delete(status)
+                status = None
 
-        await status.delete()
-
-        for e in info["entries"]:
+            index += 1
             msg = "%s개 중에서 %s번째 검색 결과입니다.\n%s\n찾는게 맞다면 :thumbsup:, 아니면 :thumbsdown:을 눌러주세요." % (
-                len(info["entries"]), info["entries"].index(e) + 1, e["webpage_url"])
-            query = await message.channel.send(msg)
+                count, index, e["webpage_url"])
+            query = await self.sender.send(message.channel, msg)
             try:
-                await query.add_reaction(u"\U0001F44D")
-                await query.add_reaction(u"\U0001F44E")
+                await self.sender.add_reaction(query, u"\U0001F44D")
+                await self.sender.add_reaction(query, u"\U0001F44E")
             except discord.errors.Forbidden:
                 pass
 
@@ -606,11 +1030,13 @@ class GSMBot(discord.Client):
                 break
 
             try:
-                await query.delete()
+                await self.sender.delete(query)
             except discord.errors.Forbidden:
                 pass
 
-        await message.channel.send("검색을 종료합니다.")
+        if status is not None:
+            await self.sender.delete(status)
+        await self.sender.send(message.channel, "검색을 종료합니다.")
 
     async def command_source(self, message):
         """
@@ -622,33 +1048,17 @@ class GSMBot(discord.Client):
             url=Strings.GITHUB,
             colour=self.color
         )
-        msg = await message.channel.send(embed=em)
+        msg = await self.sender.send(message.channel, embed=em)
         await asyncio.sleep(15)
 
         try:
-            await msg.delete()
-            await message.channel.send("Github 링크는 자동으로 삭제했습니다.")
+            await self.sender.delete(msg)
+            await self.sender.send(message.channel, "Github 링크는 자동으로 삭제했습니다.")
         except discord.errors.Forbidden:
             pass
 
     async def message_log(self, message):
-        # 해당 서버의 고유 아이디마다 json파일을 생성
-        directory = os.path.join("..", "keyword", "%s.json" % message.guild.id)
-
-        if os.path.exists(directory):  # 파일이 이미 존재한다면
-            with open(directory, "r", encoding="UTF8") as f:
-                temp = json.load(f)  # 파일을 딕셔너리로 읽어온다
-        else:  # 파일이 없다면
-            temp = {}  # 비어있는 딕셔너리 생성
-
-        for i in message.content.split():
-            if i in self.commands:  # 명령어는 키워드로 카운트하지 않기 위해서 제외함
-                continue
-            # 키워드가 이미 있는지 없는지 검사해서, 있다면 기존 값 + 1 리턴, 없다면 1 리턴
-            value = (lambda _bool: temp[i] +
-                     1 if _bool else 1)(i in temp.keys())
-            # temp 딕셔너리를 업데이트한다. 값이 이미 있다면 값을 바꾸고, 없다면 새로 키:값 쌍을 추가한다
-            temp[i] = value
-
-        with open(directory, "w", encoding="UTF8") as f:  # 파일을 쓰기 모드로 열어서
-            json.dump(temp, f, ensure_ascii=False, indent=4)  # 새로운 값으로 덮어쓰기한다
+        # 서버의 고유 아이디마다 키워드를 메모리에 모아두고, 파일 저장은 KeywordCounter가 주기적으로 처리한다
+        # 명령어는 키워드로 카운트하지 않기 위해서 제외함
+        keywords = [i for i in message.content.split() if i not in self.commands]
+        self.keywords.add(message.guild.id, keywords)
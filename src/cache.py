@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict, namedtuple
+
+
+class TTLCache:
+    """
+    저장한 지 ttl초가 지나면 만료되는 캐시.
+    maxsize가 주어지면 가장 오랫동안 사용하지 않은 항목부터 지운다.
+    """
+
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.items = OrderedDict()  # 키 : (저장한 시각, 값)
+
+    def get(self, key, default=None):
+        item = self.items.get(key)
+        if item is None or time.time() - item[0] > self.ttl:
+            return default
+
+        self.items.move_to_end(key)
+        return item[1]
+
+    def set(self, key, value, saved_at=None):
+        self.items[key] = (time.time() if saved_at is None else saved_at, value)
+        self.items.move_to_end(key)
+
+        if self.maxsize is not None:
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def peek(self, key):
+        # 만료 여부와 관계 없이 (값, 저장된 지 지난 시간)을 반환한다
+        item = self.items.get(key)
+        if item is None:
+            return None, None
+        return item[1], time.time() - item[0]
+
+    def age(self, key):
+        # 저장된 지 몇 초가 지났는지 반환하며, 저장된 적이 없다면 None을 반환한다
+        item = self.items.get(key)
+        return None if item is None else time.time() - item[0]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    연속으로 threshold번 실패한 서버에는 cooldown초 동안 요청을 보내지 않는다.
+    cooldown이 지나면 한 번만 요청을 허용해서 서버가 살아났는지 확인한다.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, threshold=3, cooldown=60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trying = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CircuitBreaker.CLOSED
+        if time.time() - self.opened_at < self.cooldown or self.trying:
+            return CircuitBreaker.OPEN
+        return CircuitBreaker.HALF_OPEN
+
+    def allow(self):
+        state = self.state
+        if state == CircuitBreaker.HALF_OPEN:
+            self.trying = True
+        return state != CircuitBreaker.OPEN
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trying = False
+
+    def failure(self):
+        self.failures += 1
+        if self.trying or self.failures >= self.threshold:
+            self.opened_at = time.time()
+        self.trying = False
+
+
+class CacheInfo(namedtuple("CacheInfo", ["age", "stale", "breaker"])):
+    """
+    응답과 함께 전달되는 캐시 정보
+
+    age: float
+        데이터를 받아온 지 지난 시간(초 단위)
+
+    stale: bool
+        만료된 데이터라서 백그라운드에서 새로 받아오는 중인지
+
+    breaker: str
+        해당 서버의 CircuitBreaker 상태
+    """
+
+    def describe(self):
+        minutes = int(self.age / 60)
+        if minutes < 1:
+            text = "방금 불러온 정보"
+        elif minutes < 60:
+            text = "%d분 전에 불러온 정보" % minutes
+        else:
+            text = "%d시간 전에 불러온 정보" % (minutes / 60)
+
+        if self.stale:
+            text += " · 새로 불러오는 중"
+        if self.breaker == CircuitBreaker.OPEN:
+            text += " · 서버 응답 없음"
+        elif self.breaker == CircuitBreaker.HALF_OPEN:
+            text += " · 서버 확인 중"
+        return text
@@ -0,0 +1,56 @@
+import asyncio
+import aiohttp
+
+
+class HTTPClient:
+    """
+    모든 스크래퍼가 함께 사용하는 비동기 HTTP 클라이언트.
+    하나의 세션으로 연결을 재사용하고, 호스트별 연결 수와 시간 제한, 재시도를 관리한다.
+    """
+    session = None
+    limit_per_host = 4
+    timeout = aiohttp.ClientTimeout(total=30, connect=5, sock_read=10)
+    retries = 3
+    backoff = 0.5  # 재시도할 때마다 두 배씩 늘어나는 대기 시간(초 단위)
+    headers = {"User-Agent": "Mozilla/5.0 (compatible; GSM Bot)"}
+
+    @classmethod
+    def get_session(cls):
+        # 세션은 이벤트 루프 안에서 만들어야 하므로 처음 요청할 때 생성한다
+        if cls.session is None or cls.session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=cls.limit_per_host)
+            cls.session = aiohttp.ClientSession(
+                connector=connector, timeout=cls.timeout, headers=cls.headers)
+        return cls.session
+
+    @classmethod
+    async def get(cls, url, encoding=None):
+        """
+        url의 내용을 문자열로 가져온다.
+        연결 실패, 시간 초과, 5xx 응답은 재시도하며, 끝내 실패하면 마지막 예외를 발생시킨다.
+
+        url: str
+        encoding: str
+            응답의 인코딩, 주어지지 않으면 응답 헤더를 따른다
+        """
+        delay = cls.backoff
+
+        for attempt in range(cls.retries):
+            try:
+                async with cls.get_session().get(url) as response:
+                    if response.status >= 500:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info, response.history,
+                            status=response.status, message=response.reason)
+                    return await response.text(encoding=encoding)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == cls.retries - 1:
+                    raise
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    @classmethod
+    async def close(cls):
+        if cls.session is not None:
+            await cls.session.close()
+            cls.session = None
@@ -0,0 +1,460 @@
+import asyncio
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from functools import partial
+
+from storage import atomic_dump_json
+
+
+def rank(item):
+    # 입력된 횟수의 내림차순, 횟수가 같다면 키워드의 오름차순
+    return -item[1], item[0]
+
+
+class TopK:
+    """
+    횟수가 가장 많은 k개의 키워드만 정렬된 상태로 유지한다.
+    횟수는 늘어나기만 하므로, 갱신된 키워드만 비교하면 순위를 정확히 유지할 수 있다.
+    """
+
+    def __init__(self, table, k=10):
+        self.k = k
+        self.items = heapq.nsmallest(k, table.items(), key=rank)
+
+    def update(self, keyword, count):
+        for i, (item, _) in enumerate(self.items):
+            if item == keyword:
+                self.items[i] = (keyword, count)
+                break
+        else:
+            # 순위 밖의 키워드라면 마지막 순위보다 앞설 때만 추가한다
+            if len(self.items) >= self.k and rank((keyword, count)) >= rank(self.items[-1]):
+                return
+            self.items.append((keyword, count))
+
+        self.items.sort(key=rank)
+        del self.items[self.k:]
+
+    def __contains__(self, keyword):
+        return any(item == keyword for item, _ in self.items)
+
+
+class KeywordTable:
+    """
+    키워드 횟수를 집계하는 테이블.
+    capacity가 주어지면 Space-Saving 알고리즘으로 최대 capacity개의 키워드만 보관한다.
+    이 때 각 키워드의 실제 횟수는 (횟수 - 오차) 이상, 횟수 이하임이 보장된다.
+    """
+
+    def __init__(self, data=None, capacity=None):
+        """
+        data: dict
+            {키워드 : 횟수} 또는 {키워드 : [횟수, 오차]} 형태의 저장된 딕셔너리
+
+        capacity: int
+            보관할 키워드의 최대 개수, None이라면 모든 키워드를 정확하게 센다
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}  # 오차가 있는 키워드만 저장한다
+        self.buckets = {}  # 횟수 : 해당 횟수를 가진 키워드의 집합 (근사 모드에서만 사용)
+        self.minimum = 0
+
+        for keyword, value in (data or {}).items():
+            count, error = value if isinstance(value, list) else (value, 0)
+            self.counts[keyword] = count
+            if error:
+                self.errors[keyword] = error
+
+        if capacity is not None:
+            self.trim(capacity)
+
+    def trim(self, capacity):
+        # 횟수가 많은 capacity개만 남기고, 최솟값을 찾기 위한 버킷을 다시 만든다
+        if len(self.counts) > capacity:
+            keep = heapq.nsmallest(capacity, self.counts.items(), key=rank)
+            self.counts = dict(keep)
+            self.errors = {i: self.errors[i] for i in self.counts if i in self.errors}
+
+        self.capacity = capacity
+        self.buckets = {}
+        for keyword, count in self.counts.items():
+            self.buckets.setdefault(count, set()).add(keyword)
+        self.minimum = min(self.buckets) if self.buckets else 0
+
+    def is_full(self):
+        return self.capacity is not None and len(self.counts) >= self.capacity
+
+    def add(self, keyword, amount=1):
+        """
+        키워드의 횟수를 늘리고, 자리를 비우기 위해 제외된 키워드가 있다면 반환한다.
+        """
+        if self.capacity is None:
+            self.counts[keyword] = self.counts.get(keyword, 0) + amount
+            return None
+
+        evicted = None
+        if keyword in self.counts:
+            count = self.counts[keyword]
+            self.remove_bucket(keyword, count)
+        elif len(self.counts) < self.capacity:
+            count = 0
+        else:
+            # 가장 적게 입력된 키워드의 자리를 물려받고, 그 횟수만큼을 오차로 기록한다
+            count = self.minimum
+            evicted = next(iter(self.buckets[count]))
+            self.remove_bucket(evicted, count)
+            del self.counts[evicted]
+            self.errors.pop(evicted, None)
+            if count:
+                self.errors[keyword] = count
+
+        count += amount
+        self.counts[keyword] = count
+        self.buckets.setdefault(count, set()).add(keyword)
+
+        if self.minimum not in self.buckets:
+            # 최솟값을 가진 키워드가 한 칸 올라갔으므로, 1씩 늘어날 때는 올라간 값이 새로운 최솟값이다
+            self.minimum = count if amount == 1 else min(self.buckets)
+        elif count < self.minimum:
+            self.minimum = count
+        return evicted
+
+    def remove_bucket(self, keyword, count):
+        bucket = self.buckets[count]
+        bucket.discard(keyword)
+        if not bucket:
+            del self.buckets[count]
+
+    def items(self):
+        return self.counts.items()
+
+    def get_top(self, k=10):
+        return [(i, c, self.errors.get(i, 0))
+                for i, c in heapq.nsmallest(k, self.counts.items(), key=rank)]
+
+    def snapshot(self):
+        # 다른 스레드에서 저장할 수 있도록 딕셔너리만 얕게 복사한다
+        return dict(self.counts), dict(self.errors)
+
+    @staticmethod
+    def encode(counts, errors):
+        return {i: [c, errors[i]] if i in errors else c for i, c in counts.items()}
+
+    @staticmethod
+    def merge(tables, capacity=None):
+        """
+        여러 테이블을 합친 새로운 테이블을 반환한다.
+        근사 테이블에 없는 키워드는 해당 테이블의 최솟값만큼 놓쳤을 수 있으므로, 그만큼을 횟수와 오차에 더한다.
+        """
+        merged = KeywordTable()
+        covered = {}  # 키워드 : 해당 키워드를 가진 가득 찬 테이블들의 최솟값 합
+        missing = 0  # 가득 찬 테이블들의 최솟값 합
+
+        for table in tables:
+            full = table.is_full()
+            if full:
+                missing += table.minimum
+
+            for keyword, count in table.counts.items():
+                merged.counts[keyword] = merged.counts.get(keyword, 0) + count
+                error = table.errors.get(keyword, 0)
+                if full:
+                    covered[keyword] = covered.get(keyword, 0) + table.minimum
+                if error:
+                    merged.errors[keyword] = merged.errors.get(keyword, 0) + error
+
+        if missing:
+            for keyword in merged.counts:
+                lost = missing - covered.get(keyword, 0)
+                if lost:
+                    merged.counts[keyword] += lost
+                    merged.errors[keyword] = merged.errors.get(keyword, 0) + lost
+
+        if capacity is not None:
+            merged.trim(capacity)
+        return merged
+
+
+
+
+class KeywordWindow:
+    """
+    키워드 횟수를 한 시간 단위의 버킷에 모으고, 24시간이 지난 버킷은 하루 단위의 버킷으로 합친다.
+    보관 기간이 지난 버킷은 삭제하므로, 사용량은 서버의 나이가 아니라 보관 기간에 비례한다.
+    """
+
+    def __init__(self, data=None, retention=30, capacity=None):
+        """
+        data: dict
+            "hourly", "daily"를 키로 가지는 저장된 버킷 딕셔너리
+
+        retention: int
+            하루 단위 버킷을 보관할 기간(일 단위)
+
+        capacity: int
+            버킷마다 보관할 키워드의 최대 개수
+        """
+        data = data or {}
+        self.retention = retention
+        self.capacity = capacity
+        # "YYYYMMDDHH" : KeywordTable
+        self.hourly = {key: KeywordTable(value, capacity) for key, value in data.get("hourly", {}).items()}
+        # "YYYYMMDD" : KeywordTable
+        self.daily = {key: KeywordTable(value, capacity) for key, value in data.get("daily", {}).items()}
+        # 마지막으로 저장한 후에 바뀌거나 삭제된 ("hourly" 또는 "daily", 키)
+        self.dirty = set()
+        self.removed = set()
+
+    def touch(self, kind, key):
+        self.dirty.add((kind, key))
+        self.removed.discard((kind, key))
+
+    def drop(self, kind, key):
+        del getattr(self, kind)[key]
+        self.dirty.discard((kind, key))
+        self.removed.add((kind, key))
+
+    def add(self, keywords, now):
+        key = now.strftime("%Y%m%d%H")
+        if key not in self.hourly:
+            self.hourly[key] = KeywordTable(capacity=self.capacity)
+
+        bucket = self.hourly[key]
+        for i in keywords:
+            bucket.add(i)
+        self.touch("hourly", key)
+
+    def compact(self, now):
+        """
+        오래된 시간 버킷을 하루 버킷으로 합치고, 보관 기간이 지난 버킷을 삭제한다.
+        변경된 내용이 있다면 True를 반환한다.
+        """
+        limit = (now - timedelta(hours=24)).strftime("%Y%m%d%H")
+        oldest = (now - timedelta(days=self.retention - 1)).strftime("%Y%m%d")
+        changed = False
+
+        for key in sorted(i for i in self.hourly if i <= limit):
+            tables = [self.hourly[key]]
+            if key[:8] in self.daily:
+                tables.append(self.daily[key[:8]])
+            self.daily[key[:8]] = KeywordTable.merge(tables, self.capacity)
+            self.drop("hourly", key)
+            self.touch("daily", key[:8])
+            changed = True
+
+        for key in [i for i in self.daily if i < oldest]:
+            self.drop("daily", key)
+            changed = True
+
+        return changed
+
+    def get_top(self, since, k=10):
+        """
+        since 이후의 버킷만 합쳐서 상위 k개의 (키워드, 횟수, 오차)를 반환한다.
+        한 시간은 시간 버킷과 하루 버킷 중 한 곳에만 들어있으므로 중복되지 않는다.
+
+        since: datetime.datetime
+            자정으로 맞춰진 시작 시각
+        """
+        hour, day = since.strftime("%Y%m%d%H"), since.strftime("%Y%m%d")
+        buckets = [v for key, v in self.hourly.items() if key >= hour]
+        buckets += [v for key, v in self.daily.items() if key >= day]
+
+        return KeywordTable.merge(buckets).get_top(k)
+
+    def take_changes(self):
+        """
+        마지막으로 저장한 후에 바뀐 버킷의 복사본과 삭제된 버킷을 반환하고, 변경 기록을 비운다.
+        반환값: ({(종류, 키) : (횟수, 오차)}, {(종류, 키)})
+        """
+        changed = {(kind, key): getattr(self, kind)[key].snapshot() for kind, key in self.dirty}
+        removed = self.removed
+        self.dirty, self.removed = set(), set()
+        return changed, removed
+
+    def restore(self, changed, removed):
+        # 저장하지 못한 변경 기록을 되돌려서 다음 주기에 다시 저장한다
+        for kind, key in changed:
+            if key in getattr(self, kind):
+                self.dirty.add((kind, key))
+        for kind, key in removed:
+            if key not in getattr(self, kind):
+                self.removed.add((kind, key))
+
+
+class KeywordCounter:
+    """
+    서버별 키워드 횟수를 메모리에 보관하고, 바뀐 서버만 모아서 주기적으로 저장한다.
+    기간별 버킷은 버킷마다 하나의 파일로 저장해서, 바뀐 버킷만 다시 쓴다.
+    기간별 버킷은 보관 기간만큼만 남기고, 전체 기간의 횟수는 최대 total_capacity개의 키워드만 보관하므로
+    사용량은 서버가 얼마나 오래됐는지와 관계 없이 일정하다.
+    """
+    # 기간 이름 : 오늘을 포함해서 거슬러 올라갈 날짜 수
+    WINDOWS = {"today": 0, "7d": 6, "30d": 29}
+
+    def __init__(self, directory, interval=30, capacity=None, total_capacity=10000):
+        """
+        directory: str
+            서버별 json 파일을 저장할 폴더
+
+        interval: int
+            디스크에 저장하는 주기(초 단위)
+
+        capacity: dict
+            {서버 아이디 : 보관할 키워드의 최대 개수}
+            여기에 있는 서버는 기간별 버킷까지 고정된 메모리만 사용하는 근사 모드로 집계한다
+
+        total_capacity: int
+            capacity에 없는 서버가 전체 기간의 횟수로 보관할 키워드의 최대 개수
+            이보다 많은 키워드가 입력되면 전체 순위만 근사 집계로 바뀐다
+        """
+        self.directory = directory
+        self.interval = interval
+        self.capacity = capacity or {}
+        self.total_capacity = total_capacity
+        self.tables = {}
+        self.rankings = {}
+        self.windows = {}
+        self.dirty = set()
+        self.task = None
+        self.flushing = None  # 저장 중인 flush의 Task
+
+    def path(self, guild_id, kind=None):
+        name = "%s.json" % guild_id if kind is None else "%s.%s.json" % (guild_id, kind)
+        return os.path.join(self.directory, name)
+
+    def window_path(self, guild_id, kind=None, key=None):
+        # 기간별 버킷을 저장하는 폴더, 또는 그 안의 버킷 파일
+        directory = os.path.join(self.directory, "%s.window" % guild_id)
+        return directory if kind is None else os.path.join(directory, "%s.%s.json" % (kind, key))
+
+    def read(self, path):
+        if os.path.exists(path):
+            with open(path, "r", encoding="UTF8") as f:
+                return json.load(f)
+        return {}
+
+    def get(self, guild_id):
+        # 처음 접근하는 서버라면 한 번만 파일에서 읽어온다
+        if guild_id not in self.tables:
+            capacity = self.capacity.get(guild_id)
+            self.tables[guild_id] = KeywordTable(self.read(self.path(guild_id)), self.get_capacity(guild_id))
+            self.rankings[guild_id] = TopK(self.tables[guild_id])
+            self.windows[guild_id] = self.read_window(guild_id, capacity)
+        return self.tables[guild_id]
+
+    def read_window(self, guild_id, capacity):
+        directory = self.window_path(guild_id)
+        if not os.path.isdir(directory):
+            # 하나의 파일로 저장하던 이전 형식이라면, 다음 저장 때 모든 버킷을 파일로 나눠서 저장한다
+            window = KeywordWindow(self.read(self.path(guild_id, "window")), capacity=capacity)
+            window.dirty = {("hourly", key) for key in window.hourly} | {("daily", key) for key in window.daily}
+            return window
+
+        data = {"hourly": {}, "daily": {}}
+        for name in os.listdir(directory):
+            if name.startswith("."):  # 저장 중에 남은 임시 파일
+                continue
+            kind, key, _ = name.split(".")
+            data[kind][key] = self.read(os.path.join(directory, name))
+        return KeywordWindow(data, capacity=capacity)
+
+    def get_capacity(self, guild_id):
+        # 전체 기간의 횟수로 보관할 키워드의 최대 개수
+        capacity = self.capacity.get(guild_id)
+        return self.total_capacity if capacity is None else capacity
+
+    def is_approximate(self, guild_id, window=None):
+        # 기간별 순위는 capacity에 있는 서버만, 전체 순위는 테이블이 가득 찬 서버도 근사 집계다
+        if self.capacity.get(guild_id) is not None:
+            return True
+        return window is None and self.get(guild_id).is_full()
+
+    def get_top(self, guild_id, window=None):
+        """
+        입력된 횟수가 가장 많은 키워드를 (키워드, 횟수, 오차)의 리스트로 반환한다.
+        window가 주어지면 해당 기간(WINDOWS의 키)의 버킷만 합쳐서 계산한다.
+        """
+        table = self.get(guild_id)
+        if window is None:
+            return [(i, c, table.errors.get(i, 0)) for i, c in self.rankings[guild_id].items]
+
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        since = today - timedelta(days=self.WINDOWS[window])
+        return self.windows[guild_id].get_top(since)
+
+    def add(self, guild_id, keywords):
+        table = self.get(guild_id)
+        ranking = self.rankings[guild_id]
+        for i in keywords:
+            evicted = table.add(i)
+            if evicted is not None and evicted in ranking:
+                # 순위에 있던 키워드가 제외됐다면 남은 키워드로 순위를 다시 만든다
+                self.rankings[guild_id] = ranking = TopK(table)
+            ranking.update(i, table.counts[i])
+        self.windows[guild_id].add(keywords, datetime.now())
+        self.dirty.add(guild_id)
+
+    def start(self, loop):
+        if self.task is None:
+            self.task = loop.create_task(self.flush_loop(loop))
+
+    async def flush_loop(self, loop):
+        while True:
+            await asyncio.sleep(self.interval)
+            # 봇이 종료되면서 이 Task가 취소되더라도 진행 중인 저장은 끝까지 마친다
+            self.flushing = asyncio.ensure_future(self.flush(loop))
+            await asyncio.shield(self.flushing)
+
+    def write(self, guild_id, table, buckets, removed):
+        # json으로 바꾸는 작업도 이벤트 루프를 막지 않도록 이 스레드에서 처리한다
+        if table is not None:
+            atomic_dump_json(KeywordTable.encode(*table), self.path(guild_id), indent=4)
+
+        os.makedirs(self.window_path(guild_id), exist_ok=True)
+        for (kind, key), bucket in buckets.items():
+            atomic_dump_json(KeywordTable.encode(*bucket), self.window_path(guild_id, kind, key))
+        for kind, key in removed:
+            path = self.window_path(guild_id, kind, key)
+            if os.path.exists(path):
+                os.remove(path)
+
+        legacy = self.path(guild_id, "window")
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+    async def flush(self, loop):
+        now = datetime.now()
+        for window in self.windows.values():
+            window.compact(now)
+
+        targets = self.dirty | {i for i, window in self.windows.items() if window.dirty or window.removed}
+        for guild_id in targets:
+            # 저장하는 동안 새로 입력된 키워드가 있다면 다시 기록되도록 복사하기 직전에 지운다
+            table = None
+            if guild_id in self.dirty:
+                self.dirty.discard(guild_id)
+                table = self.tables[guild_id].snapshot()
+            window = self.windows[guild_id]
+            buckets, removed = window.take_changes()
+
+            try:
+                await loop.run_in_executor(None, partial(self.write, guild_id, table, buckets, removed))
+            except OSError as e:
+                # 저장에 실패한 서버는 다음 주기에 다시 저장한다
+                if table is not None:
+                    self.dirty.add(guild_id)
+                window.restore(buckets, removed)
+                print("[오류] %s 서버의 키워드를 저장할 수 없습니다. (%s)" % (guild_id, e))
+
+    async def close(self, loop):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        # 진행 중인 저장이 끝날 때까지 기다린 후, 남은 서버를 모두 저장한다
+        if self.flushing is not None and not self.flushing.done():
+            await self.flushing
+        await self.flush(loop)
@@ -0,0 +1,120 @@
+"""
+MenuParser의 파싱 방법(backend)별 속도와, 딕셔너리로 급식을 보관할 때와 Menu로 보관할 때의 메모리 사용량을 비교한다.
+
+python benchmark.py [저장된 급식표 페이지 ...]
+
+저장된 페이지가 주어지지 않으면 NEIS 급식표와 같은 구조의 페이지를 만들어서 사용한다.
+페이지는 HTMLGetter.save_html 등으로 저장해둘 수 있다.
+"""
+import datetime
+import random
+import sys
+import timeit
+import tracemalloc
+
+if __package__ is None or __package__ == "":
+    from menu import Menu
+    from menu_parser import BACKENDS, MenuParser, lxml
+    from school import School
+else:
+    from .menu import Menu
+    from .menu_parser import BACKENDS, MenuParser, lxml
+    from .school import School
+
+DISHES = ["쌀밥", "현미밥", "김치", "배추김치", "깍두기", "미역국", "된장국", "불고기",
+          "돈까스&소스", "잡채", "계란말이", "우유", "과일", "떡볶이", "카레라이스"]
+
+
+def make_page(year=2019, month=3, seed=0):
+    """
+    NEIS 급식표와 같은 구조를 가진 한 달치 페이지를 만든다.
+    실제 페이지처럼 급식표 밖에도 메뉴, 스크립트 등의 요소를 함께 넣는다.
+    """
+    rand = random.Random(seed)
+    first = datetime.date(year, month, 1)
+    days = ((first.replace(day=28) + datetime.timedelta(days=4)).replace(day=1) - first).days
+
+    cells = ["<td><div></div></td>"] * ((first.weekday() + 1) % 7)
+    for day in range(1, days + 1):
+        text = [str(day)]
+        for meal in ["[조식]", "[중식]", "[석식]"]:
+            text.append(meal)
+            text += ["%s%s." % (rand.choice(DISHES), ".".join(str(rand.randint(1, 18))
+                     for _ in range(rand.randint(1, 4)))) for _ in range(rand.randint(4, 7))]
+        cells.append("<td><div>%s</div></td>" % "<br />".join(text))
+    rows = ["<tr>%s</tr>" % "".join(cells[i:i + 7]) for i in range(0, len(cells), 7)]
+
+    navigation = "".join('<li><a href="/menu{0}.do" class="menu">메뉴 {0}</a><ul>{1}</ul></li>'.format(
+        i, "".join('<li><a href="/sub{0}.do">하위 메뉴 {0}</a></li>'.format(j) for j in range(20)))
+        for i in range(40))
+    script = "<script>var data = [%s];</script>" % ",".join(str(i) for i in range(2000))
+
+    return ("<html><head><title>학교급식</title>{script}</head><body>"
+            "<div id='header'><ul>{navigation}</ul></div>"
+            "<div id='contents'><div class='sub_con'><table class='tbl_calendar'>"
+            "<caption>급식</caption><thead><tr><th>일</th></tr></thead>"
+            "<tbody>{rows}</tbody></table></div></div>"
+            "<div id='footer'><ul>{navigation}</ul></div></body></html>").format(
+        script=script, navigation=navigation, rows="".join(rows))
+
+
+def run(pages, number=20):
+    school = School(School.Region.GWANGJU, School.Type.HIGH, "F100000120")
+    today = datetime.date(2019, 3, 1)
+    backends = [i for i in BACKENDS if i != "lxml" or lxml is not None]
+    parsers = {backend: MenuParser(school, backend=backend) for backend in backends}
+
+    for name, page in pages:
+        expected = parsers["html.parser"].parse_page(page, today).menu
+        print("{} ({:.1f} KB)".format(name, len(page.encode("UTF-8")) / 1024))
+
+        base = None
+        for backend, parser in parsers.items():
+            # 모든 방법이 같은 결과를 반환하는지 먼저 확인한다
+            assert parser.parse_page(page, today).menu == expected, backend
+
+            elapsed = timeit.timeit(lambda: parser.parse_page(page, today), number=number) / number
+            base = base or elapsed
+            print("  {:<12} {:8.2f} ms  x{:.1f}".format(backend, elapsed * 1000, base / elapsed))
+
+
+def measure(build):
+    # build가 만든 객체들이 차지하고 있는 메모리(byte)를 반환한다
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def run_memory(pages, copies=50):
+    """
+    여러 학교의 여러 달을 캐시했을 때를 가정해서, 각 페이지를 copies번씩 파싱한 결과를 보관한다.
+    """
+    school = School(School.Region.GWANGJU, School.Type.HIGH, "F100000120")
+    today = datetime.date(2019, 3, 1)
+    parser = MenuParser(school)
+
+    legacy = measure(lambda: [parser.parse_table(page) for _, page in pages for _ in range(copies)])
+    # 음식 이름 표도 함께 측정되도록 비워두고 시작한다
+    del Menu.strings[:]
+    Menu.string_index.clear()
+    compact = measure(lambda: [Menu(parser.parse_table(page), today) for _, page in pages for _ in range(copies)])
+
+    print("{} months".format(len(pages) * copies))
+    print("  {:<12} {:8.1f} KB".format("dict", legacy / 1024))
+    print("  {:<12} {:8.1f} KB  x{:.1f}".format("Menu", compact / 1024, legacy / compact))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        targets = []
+        for path in sys.argv[1:]:
+            with open(path, "r", encoding="UTF-8") as f:
+                targets.append((path, f.read()))
+    else:
+        targets = [("generated", make_page())]
+
+    run(targets)
+    run_memory(targets)
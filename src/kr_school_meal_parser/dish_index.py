@@ -0,0 +1,82 @@
+import datetime
+import re
+
+if __package__ is None or __package__ == "":
+    from menu import Menu
+else:
+    from .menu import Menu
+
+
+class DishIndex:
+    """
+    음식 이름으로 해당 음식이 나오는 (날짜, 식사)를 바로 찾을 수 있도록 만든 역색인.
+    음식 이름의 모든 부분 문자열을 키로 저장해두기 때문에, 검색할 때는 딕셔너리를 한 번만 찾으면 된다.
+    """
+
+    def __init__(self):
+        self.occurrences = {}  # 음식 이름 : {(날짜, 식사), ...}
+        self.substrings = {}  # 부분 문자열 : {음식 이름, ...}
+        self.months = {}  # (연도, 월) : {음식 이름, ...}
+
+    @staticmethod
+    def normalize(name):
+        # 띄어쓰기와 대소문자가 달라도 같은 음식으로 취급한다
+        return re.sub(r"\s+", "", name).lower()
+
+    def update(self, year, month, menu):
+        """
+        해당 달의 색인을 menu의 내용으로 교체한다.
+
+        menu: Menu
+        """
+        self.remove(year, month)
+
+        dishes = set()
+        for day in range(1, 32):
+            for time in Menu.TIMES:
+                for dish in menu.get(day, time) or []:
+                    name = self.normalize(dish)
+                    if not name:
+                        continue
+                    if name not in self.occurrences:
+                        self.__add_name(name)
+                    self.occurrences[name].add((datetime.date(year, month, day), time))
+                    dishes.add(name)
+
+        self.months[(year, month)] = dishes
+
+    def remove(self, year, month):
+        for name in self.months.pop((year, month), ()):
+            occurrences = self.occurrences[name]
+            occurrences -= {i for i in occurrences if (i[0].year, i[0].month) == (year, month)}
+            if not occurrences:
+                self.__remove_name(name)
+
+    def find(self, query, since=None):
+        """
+        이름에 query가 들어간 음식들이 나오는 [(날짜, 식사, 음식 이름)]을 날짜 순서대로 반환한다.
+        since가 주어지면 그 날짜부터의 결과만 반환한다.
+        """
+        result = []
+        for name in self.substrings.get(self.normalize(query), ()):
+            result += [(day, time, name) for day, time in self.occurrences[name]
+                       if since is None or day >= since]
+
+        result.sort(key=lambda i: (i[0], Menu.TIMES.index(i[1]), i[2]))
+        return result
+
+    def __add_name(self, name):
+        self.occurrences[name] = set()
+        for i in range(len(name)):
+            for j in range(i + 1, len(name) + 1):
+                self.substrings.setdefault(name[i:j], set()).add(name)
+
+    def __remove_name(self, name):
+        del self.occurrences[name]
+        for i in range(len(name)):
+            for j in range(i + 1, len(name) + 1):
+                names = self.substrings.get(name[i:j])
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.substrings[name[i:j]]
@@ -1,4 +1,5 @@
 import re
+from array import array
 from datetime import date, datetime
 
 
@@ -8,22 +9,82 @@ class Menu:
         LUNCH = "lunch"
         DINNER = "dinner"
 
+    TIMES = (Time.BREAKFAST, Time.LUNCH, Time.DINNER)
+
+    # 모든 Menu가 함께 사용하는 음식 이름 표
+    # 같은 음식 이름은 한 번만 저장하고, 각 Menu는 표의 번호만 가지고 있는다
+    strings = []
+    string_index = {}
+
+    __slots__ = ("date", "days", "offsets", "dishes", "request_time")
+
     def __init__(self, menu_list, today_date):
         """
         Menu 클래스의 생성자
 
         menu_list: dict
-            "breakfast", "lunch", "dinner"이 키로 이루어진 급식 정보 딕셔너리
+            날짜를 키로, "breakfast", "lunch", "dinner"이 키로 이루어진 급식 정보 딕셔너리를 값으로 가지는 딕셔너리
 
         today_date: datetime.date
             해당 급식의 날짜 정보
         """
-        # 급식의 날짜 정보가 현재 날짜와 일치하는 지 검사
-        authenticity = (today_date == date.today())
+        self.date = today_date
+        self.days = 0  # 급식 정보가 있는 날짜를 비트로 표시한다
+
+        # (날짜 - 1) * 3 + 식사 번호 위치부터 offsets[위치 + 1] 전까지가 dishes에서 해당 식사의 음식들이다
+        self.offsets = array("I", [0])
+        self.dishes = array("I")
+
+        for day in range(1, 32):
+            meals = menu_list.get(day)
+            if meals is not None:
+                self.days |= 1 << day
+
+            for time in Menu.TIMES:
+                for dish in (meals or {}).get(time, []):
+                    self.dishes.append(Menu.intern(dish))
+                self.offsets.append(len(self.dishes))
 
-        self.menu = menu_list
-        self.today = menu_list[today_date.day] if authenticity else None
         self.request_time = datetime.now()
 
+    @staticmethod
+    def intern(dish):
+        index = Menu.string_index.get(dish)
+        if index is None:
+            index = Menu.string_index[dish] = len(Menu.strings)
+            Menu.strings.append(dish)
+        return index
+
+    def get(self, day, time=None):
+        """
+        해당 날짜의 급식 정보 딕셔너리를 반환한다.
+        time이 주어지면 해당 식사의 음식 리스트만 반환한다.
+        급식 정보가 없는 날짜라면 None을 반환한다.
+        """
+        if not 1 <= day <= 31 or not self.days & (1 << day):
+            return None
+
+        if time is not None:
+            return self.__get_dishes(day, Menu.TIMES.index(time))
+        return {time: self.__get_dishes(day, i) for i, time in enumerate(Menu.TIMES)}
+
+    def __get_dishes(self, day, meal):
+        position = (day - 1) * 3 + meal
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return [Menu.strings[i] for i in self.dishes[start:end]]
+
+    @property
+    def menu(self):
+        return {day: self.get(day) for day in range(1, 32) if self.days & (1 << day)}
+
+    @property
+    def today(self):
+        # 급식의 날짜 정보가 현재 날짜와 일치하는 지 검사
+        authenticity = (self.date == date.today())
+        return self.get(self.date.day) if authenticity else None
+
+    def __bool__(self):
+        return bool(self.days)
+
     def __str__(self):
         return str(self.menu)
@@ -1,14 +1,27 @@
+import asyncio
 import datetime
 import json
 import logging
 import re
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
 
 if __package__ is None or __package__ == "":
+    from dish_index import DishIndex
     from menu import Menu
     from school import School
 else:
+    from .dish_index import DishIndex
     from .menu import Menu
     from .school import School
 
@@ -26,6 +39,16 @@ logger.addHandler(handler)
 
 regex = re.compile(r"[가-힣&\s]+")
 
+# 급식표의 각 날짜 칸을 찾기 위한 선택자
+SELECTOR = "#contents > div > table > tbody > tr > td > div"
+XPATH = "//*[@id='contents']/div/table/tbody/tr/td/div"
+
+# html.parser: 페이지 전체를 BeautifulSoup으로 파싱한다
+# strainer: #contents 요소만 BeautifulSoup으로 파싱한다
+# lxml: BeautifulSoup 없이 lxml로 파싱한다
+BACKENDS = ("html.parser", "strainer", "lxml")
+DEFAULT_BACKEND = "lxml" if lxml is not None else "strainer"
+
 
 def save_to_json(result, name="result.json"):
     """
@@ -47,8 +70,28 @@ def save_to_json(result, name="result.json"):
 
 
 class MenuParser:
-    def __init__(self, school):
+    TIMEOUT = 10
+
+    def __init__(self, school, fetch=None, backend=DEFAULT_BACKEND):
+        """
+        school: School
+
+        fetch: coroutine function
+            url을 받아 페이지의 내용을 반환하는 비동기 함수
+            주어지지 않으면 get_menu_async는 요청마다 aiohttp 세션을 새로 만든다
+
+        backend: str
+            페이지를 파싱할 방법, BACKENDS 중 하나
+
+        급식 정보가 있는 달을 파싱하면 self.index(DishIndex)에 자동으로 추가된다.
+        """
+        if backend not in BACKENDS or (backend == "lxml" and lxml is None):
+            raise ValueError("{} backend is not available.".format(backend))
+
         self.school = school
+        self.fetch = fetch
+        self.backend = backend
+        self.index = DishIndex()
 
     def get_menu(self, year=None, month=None):
         """
@@ -59,22 +102,99 @@ class MenuParser:
         year: int
         month: int
         """
-        if year is None or month is None:
-            today = datetime.date.today()
-        else:
-            today = datetime.date(year, month, 1)
-
+        today = self.__get_date(year, month)
         url = self.__create_url(today.year, today.month)
         page = self.__get_page(url)
-        soup = BeautifulSoup(page, "html.parser")
-        items = soup.select("#contents > div > table > tbody > tr > td > div")
-        res = self.__parse_menu_list(items)
 
-        return Menu(res, today)
+        return self.parse_page(page, today)
+
+    async def get_menu_async(self, year=None, month=None):
+        """
+        get_menu의 비동기 버전으로, 페이지를 받아오는 동안 이벤트 루프를 막지 않는다.
+        페이지를 받아오지 못하면 그 예외가 그대로 발생한다.
+
+        year: int
+        month: int
+        """
+        today = self.__get_date(year, month)
+        url = self.__create_url(today.year, today.month)
+        page = await self.__get_page_async(url)
+
+        return self.parse_page(page, today)
+
+    async def get_menu_range(self, start_date, end_date, get_month=None):
+        """
+        start_date부터 end_date까지 (날짜, 급식 딕셔너리)를 날짜 순서대로 하나씩 반환하는 비동기 제너레이터.
+        필요한 달의 급식은 모두 동시에 가져오며, 급식 정보가 없는 날은 None을 반환한다.
+
+        start_date: datetime.date
+        end_date: datetime.date
+        get_month: coroutine function
+            (year, month)를 받아서 Menu를 반환하는 함수, 주어지지 않으면 get_menu_async를 사용한다
+            이미 가져온 달을 캐시해두고 싶을 때 사용한다
+        """
+        get_month = get_month or self.get_menu_async
+
+        months = []
+        month = start_date.replace(day=1)
+        while month <= end_date:
+            months.append(month)
+            month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+        tasks = [asyncio.ensure_future(get_month(i.year, i.month)) for i in months]
+        try:
+            day = start_date
+            for month, task in zip(months, tasks):
+                menu = await task
+                while day <= end_date and (day.year, day.month) == (month.year, month.month):
+                    yield day, menu.get(day.day)
+                    day += datetime.timedelta(days=1)
+        finally:
+            # 중간에 멈췄다면 아직 가져오는 중인 달은 취소한다
+            for task in tasks:
+                task.cancel()
+
+    def __get_date(self, year, month):
+        if year is None or month is None:
+            return datetime.date.today()
+        return datetime.date(year, month, 1)
+
+    def parse_page(self, page, today):
+        """
+        급식표 페이지를 파싱해서 Menu를 반환한다.
+
+        page: str
+        today: datetime.date
+        """
+        menu = Menu(self.parse_table(page), today)
+        # 점검 중인 페이지처럼 비어 있는 결과로 이미 색인된 달을 지우지 않는다
+        if menu:
+            self.index.update(today.year, today.month, menu)
+
+        return menu
+
+    def parse_table(self, page):
+        """
+        급식표 페이지를 파싱해서 {날짜 : {"breakfast", "lunch", "dinner" : 음식 리스트}}를 반환한다.
+
+        page: str
+        """
+        items = self.__get_items(page)
+        return self.__parse_menu_list(items)
+
+    def __get_items(self, page):
+        # 내용이 있는 날짜 칸마다 그 안의 문자열 리스트를 반환한다
+        if self.backend == "lxml":
+            tree = lxml.html.fromstring(page)
+            return [list(item.itertext()) for item in tree.xpath(XPATH) if len(item) or item.text]
+
+        parse_only = SoupStrainer(id="contents") if self.backend == "strainer" else None
+        soup = BeautifulSoup(page, "html.parser", parse_only=parse_only)
+        return [list(item.strings) for item in soup.select(SELECTOR) if item.contents]
 
     def __get_page(self, url):
         try:
-            page = requests.get(url)
+            page = requests.get(url, timeout=self.TIMEOUT)
             page.encoding = "UTF-8"
         except Exception as e:
             logger.error(e)
@@ -82,6 +202,20 @@ class MenuParser:
 
         return page.text
 
+    async def __get_page_async(self, url):
+        # 실패를 None으로 바꾸지 않고 호출한 쪽(서킷 브레이커 등)에 그대로 알린다
+        try:
+            if self.fetch is not None:
+                return await self.fetch(url)
+
+            timeout = aiohttp.ClientTimeout(total=self.TIMEOUT)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(url) as page:
+                    return await page.text(encoding="UTF-8")
+        except Exception as e:
+            logger.error("{}: {!r}".format(url, e))
+            raise
+
     def __create_url(self, year, month):
         today = datetime.date(year, month, 1)
 
@@ -105,16 +239,16 @@ class MenuParser:
                 Menu.Time.DINNER: []
             }
 
-            if item.contents:
-                for text in item.strings:
-                    if text.isdigit():
-                        result[int(text)] = menu
-                    else:
-                        index = self.__set_index(index, text)
-                        match_result = regex.match(text)
+            for text in item:
+                if text.isdigit():
+                    result[int(text)] = menu
+                    continue
+
+                index = self.__set_index(index, text)
+                match_result = regex.match(text)
 
-                    if index is not None and match_result:
-                        menu[index].append(match_result.group())
+                if index is not None and match_result:
+                    menu[index].append(match_result.group())
 
         return result
 
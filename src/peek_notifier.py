@@ -0,0 +1,56 @@
+import asyncio
+
+import discord
+
+
+class PeekNotifier:
+    """
+    감시하는 사용자의 변경 사항을 (사용자, 채널)마다 window초 동안 모았다가 한 번에 보낸다.
+    같은 항목이 여러 번 바뀌면 처음 상태와 마지막 상태만 남기고,
+    처음 상태로 되돌아간 항목은 보내지 않는다.
+    """
+
+    def __init__(self, render, window=10, send=None):
+        """
+        render: function
+            render(이름, {항목 : (처음 상태, 마지막 상태)})로 (메시지, Embed)를 만드는 함수
+
+        window: int
+            변경 사항을 모을 시간(초 단위)
+
+        send: coroutine function
+            send(채널, 메시지, embed=Embed)로 알림을 보내는 함수, 주어지지 않으면 channel.send를 사용한다
+        """
+        self.render = render
+        self.window = window
+        self.send = send or (lambda channel, *args, **kwargs: channel.send(*args, **kwargs))
+        self.pending = {}  # (사용자 아이디, 채널 아이디) : [채널, 이름, {항목 : (처음 상태, 마지막 상태)}]
+
+    def add(self, channel, user_id, name, changes):
+        """
+        changes: dict
+            {항목 : (바뀌기 전 상태, 바뀐 후 상태)}
+        """
+        key = (user_id, channel.id)
+        if key not in self.pending:
+            self.pending[key] = [channel, name, {}]
+            asyncio.get_event_loop().call_later(
+                self.window, lambda: asyncio.ensure_future(self.flush(key)))
+
+        item = self.pending[key]
+        item[1] = name
+        for field, (before, after) in changes.items():
+            first = item[2][field][0] if field in item[2] else before
+            item[2][field] = (first, after)
+
+    async def flush(self, key):
+        channel, name, changes = self.pending.pop(key)
+        changes = {field: state for field, state in changes.items() if state[0] != state[1]}
+        if not changes:  # 모든 변경이 원래대로 돌아왔다면 보내지 않는다
+            return
+
+        msg, em = self.render(name, changes)
+        try:
+            await self.send(channel, msg, embed=em)
+        except discord.errors.HTTPException as e:
+            print("[오류] %s 채널에 감시 알림을 보낼 수 없습니다. (%s)" % (channel.id, e))
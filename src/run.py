@@ -13,11 +13,22 @@ else:
 
 admin = parser.getint("Default", "admin")
 token = parser.get("Default", "token")
+# 감시 알림을 모아서 보낼 시간(초 단위)
+peek_window = parser.getint("Default", "peek_window", fallback=10)
+
+# 전체 기간의 키워드 순위에 보관할 키워드의 최대 개수
+keyword_total_capacity = parser.getint("Default", "keyword_total_capacity", fallback=10000)
+
+# [Keyword] 섹션에 "서버 아이디 = 키워드 개수"로 적힌 서버는 근사 모드로 키워드를 집계한다
+keyword_capacity = {}
+if parser.has_section("Keyword"):
+    keyword_capacity = {int(k): int(v) for k, v in parser.items("Keyword")}
 
 timer = Timer()
 
 timer.start()
-GSMBot(admin=admin).run(token)
+GSMBot(admin=admin, keyword_capacity=keyword_capacity, keyword_total_capacity=keyword_total_capacity,
+       peek_window=peek_window).run(token)
 hour, minute, second = timer.end()
 
 print("Run Time : %02d:%02d:%02d" % (hour, minute, second))
\ No newline at end of file
@@ -0,0 +1,48 @@
+import json
+import os
+
+from kr_school_meal_parser.school import School
+from storage import atomic_dump_json
+
+
+class SchoolConfig:
+    """
+    서버마다 식단표를 가져올 학교를 저장한다.
+    설정하지 않은 서버와 1:1 채팅에서는 기본 학교를 사용한다.
+    """
+
+    def __init__(self, path, default):
+        self.path = path
+        self.default = default
+        self.schools = {}  # 서버 아이디 : School
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="UTF8") as f:
+                for guild_id, (region, school_type, code) in json.load(f).items():
+                    self.schools[int(guild_id)] = School(region, school_type, code)
+
+    def get(self, guild):
+        if guild is None:
+            return self.default
+        return self.schools.get(guild.id, self.default)
+
+    def set(self, guild_id, school):
+        self.schools[guild_id] = school
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {guild_id: [school.region, school.type, school.code] for guild_id, school in self.schools.items()}
+        atomic_dump_json(data, self.path, indent=4)
+
+    @staticmethod
+    def parse(region, school_type, code):
+        """
+        "gwangju", "high", "F100000120"처럼 입력된 값으로 School을 만든다.
+        올바르지 않은 값이 있다면 ValueError를 발생시킨다.
+        """
+        region = getattr(School.Region, region.upper(), None)
+        school_type = getattr(School.Type, school_type.upper(), None)
+        if region is None or school_type is None:
+            raise ValueError("올바르지 않은 교육청 또는 학교 종류입니다.")
+        return School(region, school_type, code.upper())
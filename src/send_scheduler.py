@@ -0,0 +1,301 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+import time
+from functools import partial
+
+import discord
+
+
+class TokenBucket:
+    """
+    초당 rate개씩 토큰이 채워지고, 최대 capacity개까지 모아둘 수 있는 토큰 버킷.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        # 토큰을 하나 쓸 수 있을 때까지 기다려야 하는 시간(초 단위)
+        self.refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.refill()
+        self.tokens -= 1
+
+
+class Job:
+    __slots__ = ("key", "target", "call", "future", "queued_at", "priority")
+
+    def __init__(self, key, target, call, future, priority):
+        self.key = key
+        self.target = target  # 메시지를 지우는 작업이라면 지울 Message
+        self.call = call  # 메시지를 지우는 작업이라면 None
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.priority = priority
+
+
+class SendScheduler:
+    """
+    디스코드로 보내는 모든 요청(메시지 전송, 삭제, 반응 추가)을 우선순위 큐에 넣고,
+    채널별 토큰 버킷과 전체 토큰 버킷이 허락하는 만큼만 내보낸다.
+    명령어에 대한 응답(INTERACTIVE)은 자동 알림(BACKGROUND)보다 먼저 보내며,
+    같은 채널에서 대기 중인 메시지 삭제는 한 번의 일괄 삭제로 합친다.
+
+    작업은 채널마다 (우선순위, 순서)의 heap에 넣고, 각 채널의 맨 앞 작업만 ready heap에 올린다.
+    토큰이 없는 채널은 토큰이 채워질 시각까지 throttled heap으로 옮겨두므로,
+    작업을 하나 꺼낼 때 전체 큐를 훑지 않는다.
+    """
+    INTERACTIVE = 0
+    BACKGROUND = 1
+    PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+    BULK_DELETE_LIMIT = 100
+    BULK_DELETE_AGE = datetime.timedelta(days=14)  # 이보다 오래된 메시지는 일괄 삭제할 수 없다
+
+    def __init__(self, channel_rate=1, channel_burst=5, global_rate=40, global_burst=40):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.buckets = {}  # 채널 아이디 : TokenBucket
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.channels = {}  # 채널 아이디 : (우선순위, 순서, Job)의 heap, 비어 있는 채널은 지운다
+        self.ready = []  # 각 채널의 맨 앞 작업인 (우선순위, 순서, 채널 아이디)의 heap
+        self.throttled = []  # (토큰이 채워지는 시각, 채널 아이디)의 heap
+        self.blocked = {}  # 토큰이 없는 채널 아이디 : 토큰이 채워지는 시각
+        self.queued = {priority: 0 for priority in self.PRIORITY_NAMES}
+        self.counter = itertools.count()
+        self.wake = None
+        self.worker = None
+        self.stats = {priority: {"sent": 0, "wait": 0.0, "max_wait": 0.0}
+                      for priority in self.PRIORITY_NAMES}
+        self.bulk_deleted = 0  # 일괄 삭제로 합쳐서 아낀 요청 수
+
+    def get_bucket(self, key):
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.channel_rate, self.channel_burst)
+        return self.buckets[key]
+
+    def submit(self, key, target, call, priority):
+        # 워커는 이벤트 루프 안에서 만들어야 하므로 처음 요청할 때 시작한다
+        if self.worker is None or self.worker.done():
+            self.wake = asyncio.Event()
+            self.worker = asyncio.ensure_future(self.work())
+
+        future = asyncio.get_event_loop().create_future()
+        jobs = self.channels.setdefault(key, [])
+        item = (priority, next(self.counter), Job(key, target, call, future, priority))
+        heapq.heappush(jobs, item)
+        self.queued[priority] += 1
+        if jobs[0] is item:  # 채널의 맨 앞 작업이 바뀌었다면 ready heap에 올린다
+            self.schedule(key)
+        self.wake.set()
+        return future
+
+    async def call(self, target, function, *args, priority=INTERACTIVE, **kwargs):
+        """
+        target(채널, 사용자, 메시지)에 보내는 요청 function(*args, **kwargs)를 큐에 넣고 결과를 기다린다.
+        """
+        key = target.channel.id if isinstance(target, discord.Message) else target.id
+        return await self.submit(key, None, lambda: function(*args, **kwargs), priority)
+
+    async def send(self, target, *args, priority=INTERACTIVE, **kwargs):
+        return await self.call(target, target.send, *args, priority=priority, **kwargs)
+
+    async def add_reaction(self, message, emoji, priority=INTERACTIVE):
+        return await self.call(message, message.add_reaction, emoji, priority=priority)
+
+    async def delete(self, message, priority=INTERACTIVE):
+        return await self.submit(message.channel.id, message, None, priority)
+
+    async def work(self):
+        while True:
+            if not self.channels:
+                self.wake.clear()
+                await self.wake.wait()
+                continue
+
+            job, delay = self.pop()
+            if job is None:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if job.call is not None:
+                asyncio.ensure_future(self.execute(job))
+            elif self.can_bulk_delete(job.target.channel):
+                jobs = [job] + self.pop_deletes(job.key)
+                asyncio.ensure_future(self.delete_messages(jobs))
+            else:
+                job.call = partial(SendScheduler.delete_message, job.target)
+                asyncio.ensure_future(self.execute(job))
+
+    def schedule(self, key):
+        # 토큰이 있는 채널이라면 맨 앞 작업을 ready heap에 올린다
+        # 이전에 올린 항목은 맨 앞 작업과 다르므로 꺼낼 때 버려진다
+        jobs = self.channels.get(key)
+        if jobs and key not in self.blocked:
+            heapq.heappush(self.ready, (jobs[0][0], jobs[0][1], key))
+
+    def take(self, key):
+        # 채널의 맨 앞 작업을 꺼내고, 다음 작업을 ready heap에 올린다
+        jobs = self.channels[key]
+        job = heapq.heappop(jobs)[2]
+        self.queued[job.priority] -= 1
+        if not jobs:
+            del self.channels[key]
+        self.schedule(key)
+        return job
+
+    def pop(self):
+        """
+        토큰이 남아 있는 채널의 작업 중에서 우선순위가 가장 높은 작업을 꺼낸다.
+        보낼 수 있는 작업이 없다면 (None, 다음 작업을 보낼 수 있을 때까지의 시간)을 반환한다.
+        토큰을 기다리는 채널도 없다면 시간은 None이다.
+        """
+        delay = self.global_bucket.delay()
+        if delay > 0:
+            return None, delay
+
+        # 토큰이 채워진 채널을 ready heap으로 되돌린다
+        now = time.monotonic()
+        while self.throttled and self.throttled[0][0] <= now:
+            until, key = heapq.heappop(self.throttled)
+            if self.blocked.get(key) == until:
+                del self.blocked[key]
+                self.schedule(key)
+
+        while self.ready:
+            priority, seq, key = heapq.heappop(self.ready)
+            jobs = self.channels.get(key)
+            if not jobs or jobs[0][:2] != (priority, seq) or key in self.blocked:
+                continue  # 이미 꺼냈거나 앞에 새로운 작업이 들어온 항목
+
+            if jobs[0][2].future.cancelled():  # 기다리던 곳에서 취소한 작업은 보내지 않는다
+                self.take(key)
+                continue
+
+            bucket = self.get_bucket(key)
+            wait = bucket.delay()
+            if wait > 0:
+                self.blocked[key] = now + wait
+                heapq.heappush(self.throttled, (now + wait, key))
+                continue
+
+            job = self.take(key)
+            bucket.take()
+            self.global_bucket.take()
+            self.record(job)
+            return job, 0
+
+        return None, self.throttled[0][0] - now if self.throttled else None
+
+    def pop_deletes(self, key):
+        # 같은 채널에서 대기 중인 메시지 삭제를 모두 꺼낸다
+        jobs = self.channels.get(key, [])
+        items = [item for item in jobs if item[2].call is None and not item[2].future.cancelled()]
+        items = items[:self.BULK_DELETE_LIMIT - 1]
+        if not items:
+            return []
+
+        taken = {item[1] for item in items}
+        rest = [item for item in jobs if item[1] not in taken]
+        for item in items:
+            self.queued[item[0]] -= 1
+            self.record(item[2])
+
+        if rest:
+            heapq.heapify(rest)
+            self.channels[key] = rest
+            self.schedule(key)
+        else:
+            del self.channels[key]
+        return [item[2] for item in items]
+
+    def record(self, job):
+        wait = time.monotonic() - job.queued_at
+        stats = self.stats[job.priority]
+        stats["sent"] += 1
+        stats["wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+
+    @staticmethod
+    async def execute(job):
+        try:
+            result = await job.call()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    @staticmethod
+    async def delete_message(message):
+        await message.delete()
+
+    @staticmethod
+    def can_bulk_delete(channel):
+        # 일괄 삭제는 서버 채널에서 메시지 관리 권한이 있을 때만 쓸 수 있다
+        return (isinstance(channel, discord.TextChannel) and channel.guild.me is not None
+                and channel.permissions_for(channel.guild.me).manage_messages)
+
+    async def delete_messages(self, jobs):
+        channel = jobs[0].target.channel
+        limit = datetime.datetime.utcnow() - self.BULK_DELETE_AGE
+        bulk = [job for job in jobs if job.target.created_at > limit]
+
+        if len(bulk) > 1:
+            try:
+                await channel.delete_messages([job.target for job in bulk])
+            except discord.errors.HTTPException:
+                pass
+            else:
+                self.bulk_deleted += len(bulk) - 1
+                for job in bulk:
+                    if not job.future.done():
+                        job.future.set_result(None)
+                jobs = [job for job in jobs if job not in bulk]
+
+        for job in jobs:
+            job.call = partial(SendScheduler.delete_message, job.target)
+            await self.execute(job)
+
+    def get_metrics(self):
+        """
+        우선순위별로 {"queued", "sent", "avg_wait", "max_wait"}를 반환한다.
+        """
+        metrics = {}
+        for priority, name in self.PRIORITY_NAMES.items():
+            stats = self.stats[priority]
+            metrics[name] = {
+                "queued": self.queued[priority],
+                "sent": stats["sent"],
+                "avg_wait": stats["wait"] / stats["sent"] if stats["sent"] else 0.0,
+                "max_wait": stats["max_wait"]
+            }
+        return metrics
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        for jobs in self.channels.values():
+            for item in jobs:
+                item[2].future.cancel()
+        self.channels = {}
+        self.ready = []
+        self.throttled = []
+        self.blocked = {}
+        self.queued = {priority: 0 for priority in self.PRIORITY_NAMES}
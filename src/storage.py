@@ -0,0 +1,114 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+
+def atomic_write(path, write, compress=False):
+    """
+    같은 폴더의 임시 파일에 write(f)로 먼저 저장한 후, 이름을 바꿔서 덮어쓴다.
+    저장 도중에 봇이 종료되더라도 기존 파일이 깨지지 않는다.
+
+    path: str
+    write: function
+        텍스트 파일 객체를 받아서 내용을 쓰는 함수
+    compress: bool
+        gzip으로 압축해서 저장할지
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+
+    try:
+        if compress:
+            with gzip.open(os.fdopen(fd, "wb"), "wt", encoding="UTF8") as f:
+                write(f)
+        else:
+            with os.fdopen(fd, "w", encoding="UTF8") as f:
+                write(f)
+        os.chmod(temp, 0o644)  # mkstemp는 본인만 읽을 수 있는 파일을 만든다
+        os.replace(temp, path)
+    except:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def atomic_dump_json(data, path, compress=False, **kwargs):
+    """
+    데이터를 json으로 atomic_write한다.
+
+    data: dict
+    path: str
+    compress: bool
+        gzip으로 압축해서 저장할지
+    """
+    atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, **kwargs), compress)
+
+
+class Journal:
+    """
+    변경 사항을 한 줄에 하나씩 json으로 덧붙여 저장하는 파일.
+    전체 파일을 다시 쓰지 않고 기록할 수 있으며, 재시작한 후에 기록을 순서대로 다시 읽어서 상태를 복구한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        # 기록의 리스트를 반환하며, 저장하다가 끊겨서 깨진 마지막 줄은 무시한다
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, "r", encoding="UTF8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def append(self, record):
+        with open(self.path, "a", encoding="UTF8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def rewrite(self, records):
+        # 지금 상태를 나타내는 최소한의 기록만 남기고 파일을 다시 쓴다
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write(self.path, lambda f: f.writelines(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+
+
+# name: 파일 이름, encode: 값 → json으로 저장할 수 있는 데이터, decode: 그 반대
+SnapshotFormat = namedtuple("SnapshotFormat", ["name", "encode", "decode"])
+
+
+class Snapshot:
+    """
+    파싱된 데이터를 받아온 시각과 함께 압축된 json 파일로 저장해두고, 재시작한 후에 다시 불러온다.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, name):
+        return os.path.join(self.directory, "%s.json.gz" % name)
+
+    def load(self, name):
+        """
+        (받아온 시각, 데이터)를 반환하며, 저장된 적이 없다면 None을 반환한다.
+        """
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+
+        with gzip.open(path, "rt", encoding="UTF8") as f:
+            data = json.load(f)
+        return data["saved_at"], data["data"]
+
+    def save(self, name, data, saved_at=None):
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot = {"saved_at": time.time() if saved_at is None else saved_at, "data": data}
+        atomic_dump_json(snapshot, self.path(name), compress=True, separators=(",", ":"))
@@ -0,0 +1,41 @@
+import json
+import os
+
+from storage import atomic_dump_json
+
+
+class Subscriptions:
+    """
+    자동으로 알림을 받을 채널을 종류별로 저장한다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.channels = {}  # 종류 : 채널 아이디의 집합
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="UTF8") as f:
+                self.channels = {kind: set(ids) for kind, ids in json.load(f).items()}
+
+    def get(self, kind):
+        return self.channels.get(kind, set())
+
+    def toggle(self, kind, channel_id):
+        """
+        구독하지 않은 채널이라면 구독하고, 이미 구독한 채널이라면 구독을 취소한다.
+        구독하게 됐다면 True를 반환한다.
+        """
+        channels = self.channels.setdefault(kind, set())
+        subscribed = channel_id not in channels
+
+        if subscribed:
+            channels.add(channel_id)
+        else:
+            channels.remove(channel_id)
+
+        self.save()
+        return subscribed
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_dump_json({kind: sorted(ids) for kind, ids in self.channels.items()}, self.path, indent=4)
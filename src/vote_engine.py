@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+from storage import Journal
+
+
+class Poll:
+    __slots__ = ("id", "guild_id", "channel_id", "subject", "deadline", "ballots", "message_id", "attempts")
+
+    def __init__(self, id, guild_id, channel_id, subject, deadline, ballots=None, message_id=None):
+        self.id = id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.subject = subject
+        self.deadline = deadline  # 투표가 끝나는 시각(time.time() 기준)
+        self.ballots = ballots or {}  # 사용자 아이디 : "O" 또는 "X"
+        # 반응으로 투표를 받는 메시지의 아이디, 1:1 채팅으로 투표를 받는 투표라면 None
+        self.message_id = message_id
+        self.attempts = 0  # 결과를 보내려고 시도한 횟수
+
+    @property
+    def remaining(self):
+        return max(0, self.deadline - time.time())
+
+    def tally(self):
+        result = {"O": 0, "X": 0}
+        for choice in self.ballots.values():
+            result[choice] += 1
+        return result
+
+    def to_record(self):
+        return {"op": "open", "id": self.id, "guild": self.guild_id, "channel": self.channel_id,
+                "subject": self.subject, "deadline": self.deadline, "message": self.message_id}
+
+
+class VoteEngine:
+    """
+    진행 중인 투표를 메모리에 두고, 서버마다 여러 개의 투표를 동시에 진행한다.
+    마감 시각은 하나의 heap에서 관리하며, 투표를 열고 닫거나 표를 받을 때마다
+    journal에 한 줄씩 덧붙여서 재시작한 후에도 진행 중인 투표를 그대로 이어간다.
+    투표는 결과를 보낸 후에 닫으므로, 결과를 보내기 전에 재시작하면 다시 보낸다.
+    """
+    MAX_ATTEMPTS = 3
+    RETRY_DELAY = 60  # 결과를 보내지 못했을 때 다시 시도하기까지의 시간(초 단위)
+
+    def __init__(self, path):
+        self.journal = Journal(path)
+        self.polls = {}  # 투표 번호 : Poll
+        self.deadlines = []  # (마감 시각, 투표 번호)의 heap
+        self.wake = None
+        self.task = None
+        self.load()
+        self.counter = itertools.count(max(self.polls, default=0) + 1)
+
+    def load(self):
+        closed = set()
+        for record in self.journal.load():
+            if record["op"] == "open":
+                self.polls[record["id"]] = Poll(
+                    record["id"], record["guild"], record["channel"], record["subject"], record["deadline"],
+                    message_id=record.get("message"))
+            elif record["op"] == "message" and record["id"] in self.polls:
+                self.polls[record["id"]].message_id = record["message"]
+            elif record["op"] == "ballot" and record["id"] in self.polls:
+                self.polls[record["id"]].ballots[record["user"]] = record["choice"]
+            elif record["op"] == "close":
+                closed.add(record["id"])
+
+        # 끝난 투표는 지우고, 진행 중인 투표만 남겨서 journal을 다시 쓴다
+        for poll_id in closed:
+            self.polls.pop(poll_id, None)
+        records = []
+        for poll in self.polls.values():
+            records.append(poll.to_record())
+            records += [{"op": "ballot", "id": poll.id, "user": user, "choice": choice}
+                        for user, choice in poll.ballots.items()]
+            heapq.heappush(self.deadlines, (poll.deadline, poll.id))
+        self.journal.rewrite(records)
+
+    def get_polls(self, guild_id):
+        # 해당 서버에서 진행 중인 투표를 마감 시각 순서로 반환한다, 결과를 보내는 중인 투표는 제외한다
+        return sorted((poll for poll in self.polls.values() if poll.guild_id == guild_id and poll.remaining),
+                      key=lambda poll: poll.deadline)
+
+    def get(self, poll_id):
+        return self.polls.get(poll_id)
+
+    def open(self, guild_id, channel_id, subject, seconds):
+        poll = Poll(next(self.counter), guild_id, channel_id, subject, time.time() + seconds)
+        self.polls[poll.id] = poll
+        self.journal.append(poll.to_record())
+
+        heapq.heappush(self.deadlines, (poll.deadline, poll.id))
+        if self.wake is not None:  # 가장 빨리 끝나는 투표가 바뀌었을 수 있으므로 타이머를 깨운다
+            self.wake.set()
+        return poll
+
+    def attach(self, poll_id, message_id):
+        # 반응으로 투표를 받을 메시지를 정한다
+        poll = self.polls.get(poll_id)
+        if poll is not None:
+            poll.message_id = message_id
+            self.journal.append({"op": "message", "id": poll_id, "message": message_id})
+
+    def vote(self, poll_id, user_id, choice):
+        """
+        표를 기록하며, 이미 끝난 투표라면 False를 반환한다.
+        같은 사용자가 다시 투표하면 마지막 표만 남는다.
+        """
+        poll = self.polls.get(poll_id)
+        if poll is None or not poll.remaining:  # 마감 시각이 지나서 결과를 보내는 중인 투표
+            return False
+
+        poll.ballots[user_id] = choice
+        self.journal.append({"op": "ballot", "id": poll_id, "user": user_id, "choice": choice})
+        return True
+
+    def close(self, poll_id):
+        poll = self.polls.pop(poll_id, None)
+        if poll is not None:
+            self.journal.append({"op": "close", "id": poll_id})
+        return poll
+
+    def start(self, loop, on_close):
+        """
+        마감 시각이 된 투표마다 on_close(Poll)를 실행하고, 성공하면 투표를 닫는 타이머를 시작한다.
+        on_close가 실패하면 RETRY_DELAY초 후에 MAX_ATTEMPTS번까지 다시 시도한다.
+        재시작하는 동안 마감 시각이 지난 투표는 바로 결과를 보낸다.
+
+        on_close: coroutine function
+        """
+        if self.task is None:
+            self.wake = asyncio.Event()
+            self.task = loop.create_task(self.run(on_close))
+
+    async def run(self, on_close):
+        while True:
+            self.wake.clear()
+            # 닫히지 않은 투표 중에서 가장 빨리 끝나는 투표까지 기다린다
+            while self.deadlines and self.deadlines[0][1] not in self.polls:
+                heapq.heappop(self.deadlines)
+
+            if not self.deadlines:
+                await self.wake.wait()
+                continue
+
+            delay = self.deadlines[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, poll_id = heapq.heappop(self.deadlines)
+            poll = self.polls[poll_id]
+            poll.attempts += 1
+            try:
+                await on_close(poll)
+            except asyncio.CancelledError:
+                # 결과를 보내는 도중에 종료됐다면 닫지 않고 남겨둬서 재시작한 후에 다시 보낸다
+                raise
+            except Exception as e:
+                if poll.attempts < self.MAX_ATTEMPTS:
+                    print("[오류] %s번 투표의 결과를 보낼 수 없어서 다시 시도합니다. (%s)" % (poll_id, e))
+                    heapq.heappush(self.deadlines, (time.time() + self.RETRY_DELAY, poll_id))
+                    continue
+                print("[오류] %s번 투표의 결과를 보낼 수 없습니다. (%s)" % (poll_id, e))
+            self.close(poll_id)
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -1,41 +1,77 @@
+import asyncio
+import bisect
+import calendar
 import datetime
+import hashlib
+import os
 import random
 import re
-import requests
 from bs4 import BeautifulSoup
+from collections import namedtuple
+from functools import partial
+from itertools import groupby
 
+from cache import CacheInfo, CircuitBreaker, CircuitOpenError, TTLCache
+from http_client import HTTPClient
+from kr_school_meal_parser.menu import Menu
 from kr_school_meal_parser.menu_parser import MenuParser
 from kr_school_meal_parser.school import School
+from storage import Snapshot, SnapshotFormat
 
 
 class HTMLGetter:
+    # 같은 주소를 동시에 요청하면 한 번만 받아와서 파싱한 결과를 함께 사용한다
+    tasks = {}  # 주소 : 받아와서 파싱하는 중인 Task
+    # 불러오지 못한 주소는 잠시 동안 다시 요청하지 않는다
+    failures = TTLCache(ttl=10, maxsize=256)
+
     def __init__(self, url):
         self.url = url
 
-    def get_html(self):
+    async def get_html(self):
+        if self.url in HTMLGetter.failures:
+            return None
+
         try:
-            response = requests.get(self.url)
-        except requests.exceptions.ConnectionError:
+            html = await HTTPClient.get(self.url)
+        except Exception as e:
+            print("[오류] %s 페이지를 불러올 수 없습니다. (%s)" % (self.url, e))
+            HTMLGetter.failures.set(self.url, True)
             return None
-        html = response.text
         return html
 
-    def get_soup(self):
-        html = self.get_html()
-        soup = BeautifulSoup(html, "html.parser")
-        return soup
+    async def get_soup(self):
+        """
+        페이지를 받아와서 BeautifulSoup으로 반환하며, 불러올 수 없다면 None을 반환한다.
+        반환된 soup은 같은 주소를 동시에 요청한 곳과 공유되므로 수정하지 않아야 한다.
+        """
+        if self.url not in HTMLGetter.tasks:
+            HTMLGetter.tasks[self.url] = asyncio.ensure_future(self.load_soup())
+        return await asyncio.shield(HTMLGetter.tasks[self.url])
 
-    def save_html(self):
+    async def load_soup(self):
+        try:
+            html = await self.get_html()
+            if html is None:
+                return None
+            return BeautifulSoup(html, "html.parser")
+        finally:
+            del HTMLGetter.tasks[self.url]
+
+    async def save_html(self):
+        html = await self.get_html()
         with open("save_html.html", "w") as f:
-            f.write(self.get_html())
+            f.write(html)
 
 
 class TimeCalculator:
+    # 8시 0분, 13시 30분, 19시 30분
+    # 각각 식사 시간이 끝나는 시각(분 단위로 환산함)
+    MEAL_TIME = [480, 810, 1170]
+
     @staticmethod
     def get_next_meal_index(now):
-        # 8시 0분, 13시 30분, 19시 30분
-        # 각각 식사 시간이 끝나는 시각(분 단위로 환산함)
-        meal_time = [480, 810, 1170]
+        meal_time = TimeCalculator.MEAL_TIME
 
         for i in range(len(meal_time)):
             if (now.hour * 60 + now.minute) < meal_time[i]:
@@ -43,95 +79,473 @@ class TimeCalculator:
         return len(meal_time)
 
     @staticmethod
-    def get_next_day():
-        today = datetime.datetime.today()
+    def get_next_day(now=None):
+        today = datetime.datetime.today() if now is None else now
         return today + datetime.timedelta(
             int(TimeCalculator.get_next_meal_index(today) / 3)
         )
 
+    @staticmethod
+    def get_next_boundary(now):
+        # 표시하는 식단표가 바뀌는 다음 시각을 반환한다
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        for minute in TimeCalculator.MEAL_TIME:
+            boundary = midnight + datetime.timedelta(minutes=minute)
+            if now < boundary:
+                return boundary
+        return midnight + datetime.timedelta(days=1, minutes=TimeCalculator.MEAL_TIME[0])
+
+
+Event = namedtuple("Event", ["date", "title"])
+
+
+class EventIndex:
+    """
+    캐시된 달의 학사일정을 날짜 순서로 정렬해두고, bisect로 특정 날짜 이후의 일정을 바로 찾는다.
+    """
+
+    def __init__(self):
+        self.months = {}  # (연도, 월) : [Event, ...]
+        self.events = []
+        self.dates = []
+
+    def update(self, year, month, events):
+        self.months[(year, month)] = events
+        self.events = sorted(i for events in self.months.values() for i in events)
+        self.dates = [i.date for i in self.events]
+
+    def upcoming(self, since, count):
+        start = bisect.bisect_left(self.dates, since)
+        return self.events[start:start + count]
+
+
+def get_shown_month(soup):
+    """
+    학사일정 페이지의 달력 제목에 표시된 (연도, 월)을 반환하며, 찾을 수 없다면 None을 반환한다.
+    """
+    calendar = soup.select_one("#xb_fm_list > div.calendar")
+    if calendar is None:
+        return None
+
+    # 일정 목록(ul)을 제외한 부분에서 "2019.03", "2019년 3월" 같은 표시를 찾는다
+    for child in calendar.find_all(recursive=False):
+        if child.name == "ul":
+            continue
+        found = re.search(r"(\d{4})\s*[.년/-]\s*(\d{1,2})", child.get_text(" "))
+        if found:
+            return int(found.group(1)), int(found.group(2))
+    return None
+
+
+def hash_events(events):
+    # 일정 목록이 바뀌었는지 빠르게 비교하기 위한 해시
+    text = "\n".join("%s %s" % (i.date.isoformat(), i.title) for i in sorted(events))
+    return hashlib.sha1(text.encode("UTF-8")).hexdigest()
+
+
+def diff_events(old, new):
+    """
+    두 일정 목록을 날짜별로 비교해서 (추가된 날짜, 삭제된 날짜, 바뀐 날짜)를 반환한다.
+    각각은 {날짜 : [일정 제목, ...]} 형태이며, 바뀐 날짜는 새로운 일정 제목을 가진다.
+    """
+    def group(events):
+        result = {}
+        for i in events:
+            result.setdefault(i.date, []).append(i.title)
+        return result
+
+    old, new = group(old), group(new)
+    added = {day: titles for day, titles in new.items() if day not in old}
+    removed = {day: titles for day, titles in old.items() if day not in new}
+    changed = {day: titles for day, titles in new.items()
+               if day in old and sorted(old[day]) != sorted(titles)}
+    return added, removed, changed
+
 
 class DataManager:
     gsm = School(School.Region.GWANGJU, School.Type.HIGH, "F100000120")
-    parser = MenuParser(gsm)
-    recent_meal = {}
-    recent_calendar = {}
+    parsers = {}  # 학교 코드 : MenuParser
+    region_limits = {}  # 교육청 서버 주소 : 동시에 보낼 수 있는 요청 수를 제한하는 Semaphore
+    REGION_CONCURRENCY = 2
+    CALENDAR_URL = "http://www.gsm.hs.kr/xboard/board.php?tbnum=4&year=%d&month=%d"
+    # (학교 코드, 연도, 월) : 파싱된 Menu, 학교마다 이번 달과 다음 달을 보관한다
+    menu_cache = TTLCache(ttl=6 * 60 * 60, maxsize=256)
+    # ("calendar", 연도, 월) : 날짜 순서로 정렬된 Event의 리스트
+    calendar_cache = TTLCache(ttl=60 * 60, maxsize=12)
+    # ("image", 정규화된 검색어) : 검색 결과에 있는 이미지 주소의 리스트
+    image_cache = TTLCache(ttl=6 * 60 * 60, maxsize=256)
+    events = EventIndex()
+    # 재시작한 후에도 바로 응답할 수 있도록 받아온 데이터를 디스크에 저장해둔다
+    snapshot = Snapshot(os.path.join("..", "cache"))
+    restored = set()  # 디스크에서 불러오기를 시도한 캐시 키
+    tasks = {}  # 캐시 키 : 새로 받아오는 중인 Task
+    breakers = {}  # 서버 주소 : CircuitBreaker
+    PREFETCH_DAYS = 3  # 한 달이 끝나기 며칠 전부터 다음 달 식단표를 미리 받아둘지
     item = ["아침", "점심", "저녁"]
 
     @staticmethod
-    def get_command(command, keyword=None):
+    async def get_command(command, keyword=None):
         func = getattr(DataManager, "get_%s" % command, "%s 작업을 처리하는데 문제가 발생했습니다." % command)
-        return func() if keyword is None else func(keyword)
+        return await (func() if keyword is None else func(keyword))
 
     @staticmethod
-    def get_hungry():
-        today = TimeCalculator.get_next_day()
-        next_meal = TimeCalculator.get_next_meal_index(today)
+    def get_breaker(host):
+        if host not in DataManager.breakers:
+            DataManager.breakers[host] = CircuitBreaker()
+        return DataManager.breakers[host]
+
+    @staticmethod
+    async def serve(cache, key, host, load, snapshot=None):
+        """
+        캐시에 값이 있다면 만료됐더라도 바로 반환하고, 만료된 값은 백그라운드에서 새로 받아온다.
+        캐시에 값이 없을 때만 새로 받아올 때까지 기다린다.
+        (값, CacheInfo)를 반환한다.
+
+        load: coroutine function
+            값을 새로 받아오는 함수, None을 반환하면 캐시하지 않는다
+
+        snapshot: SnapshotFormat
+            주어지면 디스크에 저장된 데이터를 먼저 불러오고, 새로 받아온 데이터를 디스크에 저장한다
+        """
+        breaker = DataManager.get_breaker(host)
+        value, age = cache.peek(key)
+
+        if value is None and snapshot is not None and key not in DataManager.restored:
+            DataManager.restored.add(key)
+            await DataManager.restore(cache, key, snapshot)
+            value, age = cache.peek(key)
 
+        if value is not None:
+            stale = age > cache.ttl
+            if stale:
+                asyncio.ensure_future(DataManager.refresh_quietly(cache, key, host, load, snapshot))
+            return value, CacheInfo(age, stale, breaker.state)
+
+        value = await DataManager.refresh(cache, key, host, load, snapshot)
+        return value, CacheInfo(0, False, breaker.state)
+
+    @staticmethod
+    async def restore(cache, key, snapshot):
+        loop = asyncio.get_event_loop()
         try:
-            this_meal = DataManager.recent_meal[today.date()][next_meal]
-            if this_meal:
-                return this_meal
-        except KeyError:
-            DataManager.recent_meal = {today.date(): {i: "" for i in range(3)}}
+            saved = await loop.run_in_executor(None, DataManager.snapshot.load, snapshot.name)
+        except (OSError, ValueError, KeyError) as e:
+            print("[오류] %s 스냅샷을 불러올 수 없습니다. (%s)" % (snapshot.name, e))
+            return
 
+        if saved is not None and key not in cache.items:
+            saved_at, data = saved
+            cache.set(key, snapshot.decode(data), saved_at)
+
+    @staticmethod
+    async def refresh(cache, key, host, load, snapshot=None):
+        # 같은 키를 동시에 요청하더라도 한 번만 받아온다
+        if key not in DataManager.tasks:
+            DataManager.tasks[key] = asyncio.ensure_future(
+                DataManager.load(cache, key, host, load, snapshot))
+        return await asyncio.shield(DataManager.tasks[key])
+
+    @staticmethod
+    async def refresh_quietly(cache, key, host, load, snapshot=None):
         try:
-            menus = DataManager.parser.get_menu()
-            result = "\n".join("- %s" % item for item in menus.menu[today.day]
-                [["breakfast", "lunch", "dinner"][next_meal % 3]])
-            
+            await DataManager.refresh(cache, key, host, load, snapshot)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print("[오류] GSM Bot이 %s의 데이터를 새로 받아올 수 없습니다. (%s)" % (host, e))
+
+    @staticmethod
+    async def load(cache, key, host, load, snapshot=None):
+        breaker = DataManager.get_breaker(host)
+        try:
+            # 계속 실패하고 있는 서버에는 요청을 보내지 않는다
+            if not breaker.allow():
+                raise CircuitOpenError("%s 서버가 응답하지 않습니다." % host)
+
+            try:
+                value = await load()
+            except Exception:
+                breaker.failure()
+                raise
+
+            breaker.success()
+            if value is not None:
+                cache.set(key, value)
+                if snapshot is not None:
+                    await DataManager.save_snapshot(snapshot, value)
+            return value
+        finally:
+            del DataManager.tasks[key]
+
+    @staticmethod
+    async def save_snapshot(snapshot, value):
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(
+                None, DataManager.snapshot.save, snapshot.name, snapshot.encode(value))
+        except OSError as e:
+            print("[오류] %s 스냅샷을 저장할 수 없습니다. (%s)" % (snapshot.name, e))
+
+    @staticmethod
+    def get_parser(school):
+        # 같은 학교를 사용하는 서버들은 하나의 MenuParser를 함께 사용한다
+        if school.code not in DataManager.parsers:
+            DataManager.parsers[school.code] = MenuParser(
+                school, fetch=partial(HTTPClient.get, encoding="UTF-8"))
+        return DataManager.parsers[school.code]
+
+    @staticmethod
+    def get_region_limit(region):
+        if region not in DataManager.region_limits:
+            DataManager.region_limits[region] = asyncio.Semaphore(DataManager.REGION_CONCURRENCY)
+        return DataManager.region_limits[region]
+
+    @staticmethod
+    async def get_month_menu(year, month, school=None):
+        """
+        한 달치 식단표를 파싱한 Menu를 (학교, 연도, 월)마다 캐시해두고, 모든 날짜와 식사가 함께 사용한다.
+        (Menu, CacheInfo)를 반환한다.
+
+        school: School
+            주어지지 않으면 GSM의 식단표를 가져온다
+        """
+        school = school or DataManager.gsm
+
+        async def load():
+            # 같은 교육청 서버에는 REGION_CONCURRENCY개까지만 동시에 요청한다
+            async with DataManager.get_region_limit(school.region):
+                menu = await DataManager.get_parser(school).get_menu_async(year, month)
+            # 아직 식단표가 올라오지 않은 달은 캐시하지 않는다
+            return menu if menu else None
+
+        def decode(data):
+            # json의 키는 문자열로 저장되므로 날짜를 다시 정수로 바꾼다
+            menu = Menu({int(day): meals for day, meals in data.items()}, datetime.date(year, month, 1))
+            # 디스크에서 불러온 달은 MenuParser를 거치지 않으므로 직접 음식 색인에 추가한다
+            DataManager.get_parser(school).index.update(year, month, menu)
+            return menu
+
+        key = (school.code, year, month)
+        snapshot = SnapshotFormat("meal-%s-%04d%02d" % (school.code, year, month), lambda menu: menu.menu, decode)
+        return await DataManager.serve(DataManager.menu_cache, key, school.region, load, snapshot)
+
+    @staticmethod
+    async def get_days(start_date, end_date, school=None):
+        """
+        start_date부터 end_date까지의 [(날짜, 급식 딕셔너리)]를 반환한다.
+        캐시된 달은 다시 받아오지 않으므로, 일주일을 조회해도 최대 두 달만 받아온다.
+        """
+        school = school or DataManager.gsm
+
+        async def get_month(year, month):
+            menu, _ = await DataManager.get_month_menu(year, month, school)
+            # 식단표가 아직 올라오지 않은 달은 빈 Menu로 취급한다
+            return menu if menu is not None else Menu({}, datetime.date(year, month, 1))
+
+        parser = DataManager.get_parser(school)
+        return [i async for i in parser.get_menu_range(start_date, end_date, get_month)]
+
+    @staticmethod
+    async def find_dish(query, school=None):
+        """
+        이번 달과 다음 달 식단표에서 이름에 query가 들어간 음식이 나오는
+        오늘 이후의 [(날짜, 식사, 음식 이름)]을 날짜 순서대로 반환한다.
+        """
+        school = school or DataManager.gsm
+        today = datetime.date.today()
+        next_month = today.replace(day=1) + datetime.timedelta(days=32)
+
+        # 색인은 캐시된 달로 만들어지므로, 두 달이 캐시되어 있는지만 확인한다
+        await asyncio.gather(
+            DataManager.get_month_menu(today.year, today.month, school),
+            DataManager.get_month_menu(next_month.year, next_month.month, school),
+            return_exceptions=True
+        )
+        return DataManager.get_parser(school).index.find(query, since=today)
+
+    @staticmethod
+    def prefetch_next_month(today, school=None):
+        # 달의 마지막 며칠 동안은 다음 달 식단표를 백그라운드에서 미리 받아둔다
+        last_day = calendar.monthrange(today.year, today.month)[1]
+        if last_day - today.day >= DataManager.PREFETCH_DAYS:
+            return
+
+        school = school or DataManager.gsm
+        next_month = today.replace(day=1) + datetime.timedelta(days=32)
+        key = (school.code, next_month.year, next_month.month)
+        if key in DataManager.menu_cache or key in DataManager.tasks:
+            return
+
+        async def prefetch():
+            try:
+                await DataManager.get_month_menu(next_month.year, next_month.month, school)
+            except Exception as e:
+                print("[오류] GSM Bot이 %s월 식단표를 미리 받아올 수 없습니다. (%s)" % (next_month.month, e))
+
+        asyncio.ensure_future(prefetch())
+
+    @staticmethod
+    async def get_hungry(now=None, school=None):
+        """
+        now를 기준으로 해당 학교의 다음 식사의 식단표를 (문자열, CacheInfo)로 반환한다.
+        """
+        today = TimeCalculator.get_next_day(now)
+        next_meal = TimeCalculator.get_next_meal_index(today)
+        DataManager.prefetch_next_month(today, school)
+
+        try:
+            menus, info = await DataManager.get_month_menu(today.year, today.month, school)
+            result = "\n".join("- %s" % item for item in menus.get(today.day, Menu.TIMES[next_meal % 3]))
+
             if not len(result):
                 raise Exception
 
-            DataManager.recent_meal[today.date()][next_meal % 3] = result
-            return result
+            return result, info
         except:
             print("[오류] GSM Bot이 식단표를 받아올 수 없습니다.")
-            return "%s 급식을 불러올 수 없습니다." % DataManager.item[next_meal % 3]
+            return "%s 급식을 불러올 수 없습니다." % DataManager.item[next_meal % 3], None
 
     @staticmethod
-    def get_calendar():
-        today = datetime.datetime.today()
+    async def get_month_events(year, month, refresh=False):
+        """
+        해당 달의 학사일정을 (Event의 리스트, CacheInfo)로 반환한다.
+        refresh가 True라면 캐시와 관계 없이 페이지를 새로 받아온다.
+        """
+        async def load():
+            soup = await HTMLGetter(DataManager.CALENDAR_URL % (year, month)).get_soup()
+            if soup is None:
+                raise ConnectionError("학사일정 페이지를 불러올 수 없습니다.")
 
-        try:
-            this_calendar = DataManager.recent_calendar[today.month]
-            if this_calendar:
-                return this_calendar
-        except KeyError:
-            DataManager.recent_calendar = {today.month: ""}
-
-        soup = HTMLGetter("http://www.gsm.hs.kr/xboard/board.php?tbnum=4").get_soup()
-
-        try:
             info = soup.select("#xb_fm_list > div.calendar > ul > li > dl")
 
-            result = "```"
+            # 사이트가 year, month를 무시하면 이번 달의 페이지가 오므로, 페이지에 표시된 달이 요청한 달인지 확인한다
+            shown = get_shown_month(soup)
+            if shown is not None and shown != (year, month):
+                raise ValueError("%s년 %s월 대신 %s년 %s월 학사일정 페이지가 왔습니다." % ((year, month) + shown))
+            checked = shown is not None
+
+            result = []
             for i in info:
                 if i.find("dd") is not None:
                     data = i.text.replace("\n", "").split("- ")
-                    result += "%6s - %s\n" % (data[0], data[1])
-                    for i in data[2:]:
-                        result += "%7s - %s\n" % ("", i)
-            result += "```"
+                    # "3.1(금)", "01"처럼 표시된 날짜에서 마지막 숫자를 일(day)로 사용한다
+                    numbers = re.findall(r"\d+", data[0])
+                    try:
+                        day = datetime.date(year, month, int(numbers[-1]))
+                    except (IndexError, ValueError):
+                        continue
+                    # 날짜에 월이 함께 표시되어 있다면 그 월도 확인한다
+                    if len(numbers) >= 2:
+                        if int(numbers[-2]) != month:
+                            raise ValueError("%s월 학사일정 페이지에 %s월 일정이 있습니다." % (month, numbers[-2]))
+                        checked = True
+                    result += [Event(day, title.strip()) for title in data[1:] if title.strip()]
+
+            # 이번 달이 아닌 페이지는 어느 달인지 확인할 수 없다면 다른 달의 일정으로 저장하지 않는다
+            today = datetime.date.today()
+            if result and not checked and (year, month) != (today.year, today.month):
+                raise ValueError("%s년 %s월 학사일정 페이지인지 확인할 수 없습니다." % (year, month))
+
+            # 일정이 있던 달이 비어 있다면 페이지를 제대로 불러오지 못한 것으로 보고 기존 일정을 유지한다
+            if not result and DataManager.calendar_cache.peek(key)[0]:
+                raise ValueError("%s월 학사일정이 비어 있습니다." % month)
 
-            DataManager.recent_calendar[today.month] = result
+            DataManager.events.update(year, month, result)
             return result
-        except AttributeError:
-            print("[오류] GSM Bot이 학사일정을 불러올 수 없습니다.")
-            return "%s년 %s월 학사일정을 불러올 수 없습니다." % (today.year, today.month)
+
+        def decode(data):
+            events = [Event(datetime.datetime.strptime(day, "%Y-%m-%d").date(), title) for day, title in data]
+            DataManager.events.update(year, month, events)
+            return events
+
+        key = ("calendar", year, month)
+        snapshot = SnapshotFormat(
+            "events-%04d%02d" % (year, month),
+            lambda events: [[i.date.isoformat(), i.title] for i in events],
+            decode
+        )
+        if refresh:
+            events = await DataManager.refresh(DataManager.calendar_cache, key, "www.gsm.hs.kr", load, snapshot)
+            return events, CacheInfo(0, False, DataManager.get_breaker("www.gsm.hs.kr").state)
+        return await DataManager.serve(DataManager.calendar_cache, key, "www.gsm.hs.kr", load, snapshot)
+
+    @staticmethod
+    async def get_adjacent_events(today):
+        """
+        지난 달, 이번 달, 다음 달의 학사일정을 동시에 가져와서 이번 달의 결과를 반환한다.
+        지난 달과 다음 달은 가져오지 못하더라도 무시한다.
+        """
+        first = today.replace(day=1)
+        months = [first - datetime.timedelta(days=1), first, first + datetime.timedelta(days=32)]
+        results = await asyncio.gather(
+            *[DataManager.get_month_events(i.year, i.month) for i in months], return_exceptions=True)
+
+        if isinstance(results[1], Exception):
+            raise results[1]
+        return results[1]
 
     @staticmethod
-    def get_image(keyword):
-        soup = HTMLGetter("https://www.google.co.kr/search?hl=en&tbm=isch&q=%s" % keyword).get_soup()
+    async def get_calendar():
+        """
+        이번 달의 학사일정을 (문자열, CacheInfo)로 반환한다.
+        """
+        today = datetime.date.today()
 
         try:
-            info = soup.find_all("img")
-            # 구글 자체 이미지가 포함되어 있기 때문에 1부터 시작한다
-            index = random.randint(1, len(info))
-            # 이미지의 링크를 가져옴
-            return info[index]["src"]
-        except:
+            events, info = await DataManager.get_adjacent_events(today)
+        except Exception:
+            print("[오류] GSM Bot이 학사일정을 불러올 수 없습니다.")
+            return "%s년 %s월 학사일정을 불러올 수 없습니다." % (today.year, today.month), None
+
+        result = "```"
+        for day, group in groupby(events, key=lambda i: i.date):
+            titles = [i.title for i in group]
+            result += "%6s - %s\n" % ("%d일" % day.day, titles[0])
+            for i in titles[1:]:
+                result += "%7s - %s\n" % ("", i)
+        result += "```"
+        return result, info
+
+    @staticmethod
+    async def get_upcoming_events(count):
+        """
+        오늘부터 다가오는 학사일정 count개를 Event의 리스트로 반환한다.
+        """
+        today = datetime.date.today()
+        await DataManager.get_adjacent_events(today)
+        return DataManager.events.upcoming(today, count)
+
+    @staticmethod
+    async def get_image(keyword):
+        """
+        구글 이미지 검색 결과 중 하나의 이미지 주소를 무작위로 반환한다.
+        검색 결과는 검색어마다 캐시해두고, 같은 검색어는 캐시된 결과에서 다시 고른다.
+        """
+        # 대소문자와 공백만 다른 검색어는 같은 검색어로 취급한다
+        keyword = " ".join(keyword.lower().split())
+
+        async def load():
+            soup = await HTMLGetter("https://www.google.co.kr/search?hl=en&tbm=isch&q=%s" % keyword).get_soup()
+            if soup is None:
+                raise ConnectionError("이미지 검색 페이지를 불러올 수 없습니다.")
+
+            # 구글 자체 이미지가 포함되어 있기 때문에 첫 번째 이미지는 제외한다
+            images = [i["src"] for i in soup.find_all("img")[1:] if i.get("src")]
+            return images or None
+
+        key = ("image", keyword)
+        images = DataManager.image_cache.get(key)
+        if images is None:
+            try:
+                images = await DataManager.refresh(DataManager.image_cache, key, "www.google.co.kr", load)
+            except Exception as e:
+                print("[오류] GSM Bot이 이미지를 가져올 수 없습니다. (%s)" % e)
+                return None
+
+        if not images:
             print("[오류] GSM Bot이 이미지를 가져올 수 없습니다.")
             return None
+        return random.choice(images)
 
 
 if __name__ == "__main__":
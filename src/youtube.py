@@ -0,0 +1,85 @@
+import asyncio
+import queue
+import youtube_dl
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+
+
+class YoutubeSearch:
+    """
+    유튜브 검색을 전용 스레드 풀에서 실행한다.
+    YoutubeDL 객체는 스레드 하나당 하나씩 미리 만들어두고 재사용하며,
+    검색 결과는 ttl초 동안 캐시한다.
+    """
+    VIDEO_URL = "https://www.youtube.com/watch?v=%s"
+    OPTIONS = {
+        "noplaylist": True,
+        "nocheckcertificate": True,
+        "ignoreerrors": True,
+        "logtostderr": False,
+        "quiet": True,
+        "no_warnings": True
+    }
+
+    def __init__(self, workers=2, ttl=30 * 60, maxsize=128):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="youtube")
+        # YoutubeDL은 여러 스레드에서 동시에 사용할 수 없으므로 스레드 수만큼 만들어둔다
+        self.extractors = queue.Queue()
+        for _ in range(workers):
+            self.extractors.put(youtube_dl.YoutubeDL(self.OPTIONS))
+        self.workers = workers
+        self.cache = TTLCache(ttl=ttl, maxsize=maxsize)  # (정규화된 검색어, 개수) : 영상 정보의 리스트
+
+    def run(self, function, *args):
+        # 쉬고 있는 YoutubeDL을 하나 빌려서 function(yt, *args)를 실행한다
+        yt = self.extractors.get()
+        try:
+            return function(yt, *args)
+        finally:
+            self.extractors.put(yt)
+
+    async def submit(self, function, *args):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, self.run, function, *args)
+
+    @staticmethod
+    def warm_extractor(yt):
+        # 처음 검색할 때 드는 추출기 초기화 비용을 미리 치러둔다
+        yt.get_info_extractor("YoutubeSearch")
+        yt.get_info_extractor("Youtube")
+
+    async def warm(self):
+        await asyncio.gather(*[self.submit(self.warm_extractor) for _ in range(self.workers)])
+
+    @staticmethod
+    def extract_videos(yt, query, count):
+        # process=False로 검색 결과 페이지만 읽고, 각 영상의 포맷은 확인하지 않는다
+        info = yt.extract_info("ytsearch%d:%s" % (count, query), download=False, process=False)
+        if not info:
+            return []
+        # 주소와 제목은 검색 결과에 이미 있으므로 필요한 정보만 남긴다
+        return [{"title": e.get("title"), "webpage_url": YoutubeSearch.VIDEO_URL % e["id"]}
+                for e in info.get("entries") or [] if e and e.get("id")]
+
+    async def search(self, query, count=5):
+        """
+        검색 결과를 {"title", "webpage_url"} 형태로 하나씩 반환하는 async generator.
+        검색 결과 페이지 한 번만 읽고, 영상마다 따로 요청하지 않는다.
+
+        query: str
+        count: int
+            가져올 검색 결과의 개수
+        """
+        key = (" ".join(query.lower().split()), count)
+        videos = self.cache.get(key)
+        if videos is None:
+            videos = await self.submit(self.extract_videos, query, count)
+            if videos:
+                self.cache.set(key, videos)
+
+        for video in videos:
+            yield video
+
+    def close(self):
+        self.executor.shutdown(wait=False)